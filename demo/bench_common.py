@@ -0,0 +1,244 @@
+# coding=utf-8
+# fish_common 性能测试
+# v1.2.0 create, yaml 配置文件读取、ini 配置访问、对象序列化和反序列化
+
+import os
+import io
+import time
+import tempfile
+import tracemalloc
+
+import yaml
+
+from fishbase.fish_common import yaml_conf_as_dict, conf_as_dict, FishConfig
+from fishbase.fish_common import FishSerializer, DeserializeInstance, commonDataType
+from fishbase.fish_common import LazyDeserializeInstance
+
+
+def gen_yaml(sections, keys):
+    lines = []
+    for i in range(sections):
+        lines.append('section_{}:'.format(i))
+        for j in range(keys):
+            lines.append('    key_{}: value {} {}'.format(j, i, j))
+        lines.append('    items:')
+        for j in range(keys // 10):
+            lines.append('        - item_{}'.format(j))
+    return '\n'.join(lines) + '\n'
+
+
+def timeit(func, repeat):
+    start = time.time()
+    for _ in range(repeat):
+        func()
+    return (time.time() - start) / repeat
+
+
+def bench_yaml(tmp_dir):
+    print('--- yaml config load ---')
+    print('{:>10} {:>16} {:>16}'.format('size', 'SafeLoader(ms)', 'yaml_conf(ms)'))
+    for sections, keys in ((10, 10), (100, 100), (500, 200)):
+        path = os.path.join(tmp_dir, 'bench_{}_{}.yaml'.format(sections, keys))
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(gen_yaml(sections, keys))
+        repeat = 3
+
+        def legacy_load():
+            with io.open(path, 'r', encoding='utf-8') as f:
+                return yaml.load(f.read(), Loader=yaml.SafeLoader)
+
+        legacy = timeit(legacy_load, repeat)
+        current = timeit(lambda: yaml_conf_as_dict(path, encoding='utf-8'), repeat)
+        print('{:>10} {:>16.1f} {:>16.1f}'.format(os.path.getsize(path), legacy * 1000,
+                                                  current * 1000))
+        os.remove(path)
+
+
+def bench_ini(tmp_dir):
+    print('--- ini config access ---')
+    path = os.path.join(tmp_dir, 'bench.ini')
+    with io.open(path, 'w', encoding='utf-8') as f:
+        for i in range(500):
+            f.write(u'[section_{}]\n'.format(i))
+            for j in range(20):
+                f.write(u'key_{}={}\n'.format(j, j))
+            f.write(u'debug=off\nhosts=a,b,c,d\n')
+    lookups = 100000
+    keys = ['section_{}'.format(i % 500) for i in range(lookups)]
+
+    # 启动：读取配置文件并访问一个 section
+    def dict_startup():
+        return conf_as_dict(path)[1]['section_1']['key_1']
+
+    def config_startup():
+        return FishConfig(path).section_1.key_1
+
+    d = conf_as_dict(path)[1]
+    cfg = FishConfig(path)
+
+    # 重复读取并转换类型
+    def dict_access():
+        for name in keys:
+            section = d[name]
+            int(section['key_1'])
+            section['debug'].strip().lower() in ('1', 'true', 'yes', 'on')
+            [h.strip() for h in section['hosts'].split(',') if h.strip()]
+
+    def config_access():
+        for name in keys:
+            section = cfg[name]
+            section.get_int('key_1')
+            section.get_bool('debug')
+            section.get_list('hosts')
+
+    print('{:>12} {:>16} {:>16}'.format('', 'conf_as_dict(ms)', 'FishConfig(ms)'))
+    print('{:>12} {:>16.1f} {:>16.1f}'.format('startup', timeit(dict_startup, 3) * 1000,
+                                              timeit(config_startup, 3) * 1000))
+    print('{:>12} {:>16.1f} {:>16.1f}'.format('{} reads'.format(lookups),
+                                              timeit(dict_access, 3) * 1000,
+                                              timeit(config_access, 3) * 1000))
+    os.remove(path)
+
+
+def legacy_serialize_instance(obj):
+    # v1.2.0 之前的 serialize_instance 实现
+    obj_dict = {'__classname__': type(obj).__name__}
+    obj_dict.update(obj.__dict__)
+    for key, value in obj_dict.items():
+        if not isinstance(value, commonDataType):
+            obj_dict.update({key: legacy_serialize_instance(value)})
+    return obj_dict
+
+
+class Node(object):
+    def __init__(self, name):
+        self.name = name
+        self.value = 1.5
+        self.tags = ['a', 'b']
+        self.left = 0
+        self.right = 0
+
+
+class SlotNode(object):
+    __slots__ = ('name', 'value', 'tags', 'left', 'right')
+
+    def __init__(self, name):
+        self.name = name
+        self.value = 1.5
+        self.tags = ['a', 'b']
+        self.left = 0
+        self.right = 0
+
+
+def build_tree(cls, depth):
+    root = cls('root')
+    level = [root]
+    for d in range(depth):
+        next_level = []
+        for node in level:
+            node.left = cls('l{}'.format(d))
+            node.right = cls('r{}'.format(d))
+            next_level.extend((node.left, node.right))
+        level = next_level
+    return root
+
+
+def build_chain(cls, depth):
+    head = cls('head')
+    node = head
+    for i in range(depth):
+        node.left = cls(str(i))
+        node = node.left
+    return head
+
+
+def build_shared(cls, depth):
+    # 每一层的 left 和 right 引用同一个对象，展开后有 2^depth 个节点
+    node = cls('leaf')
+    for i in range(depth):
+        parent = cls(str(i))
+        parent.left = parent.right = node
+        node = parent
+    return node
+
+
+def bench_serialize():
+    print('--- serialize_instance ---')
+    serializer = FishSerializer(classes=[Node, SlotNode])
+    print('{:>22} {:>12} {:>12} {:>12} {:>12}'.format('', 'legacy(ms)', 'to_dict(ms)',
+                                                      'from_dict(ms)', 'Deser(ms)'))
+    for title, obj in (('tree 2^16 nodes', build_tree(Node, 15)),
+                       ('slots tree 2^16 nodes', build_tree(SlotNode, 15)),
+                       ('chain 20000 deep', build_chain(Node, 20000)),
+                       ('shared 2^18 paths', build_shared(Node, 18))):
+        try:
+            legacy = '{:.1f}'.format(timeit(lambda: legacy_serialize_instance(obj), 3) * 1000)
+        except (RecursionError, AttributeError) as e:
+            legacy = type(e).__name__[:12]
+        data = serializer.to_dict(obj)
+        current = timeit(lambda: serializer.to_dict(obj), 3) * 1000
+        restore = timeit(lambda: serializer.from_dict(data), 3) * 1000
+        try:
+            deser = '{:.1f}'.format(timeit(lambda: DeserializeInstance(data), 3) * 1000)
+        except RecursionError:
+            deser = 'RecursionErr'
+        print('{:>22} {:>12} {:>12.1f} {:>12.1f} {:>12}'.format(title, legacy, current, restore,
+                                                              deser))
+
+
+def build_document(count):
+    # count 个结构相同的嵌套节点，DeserializeInstance 不处理 list 中的 dict，这里都使用 dict
+    return {'items': dict(('n{}'.format(i),
+                           {'id': i, 'user': {'name': {'first': 'san', 'last': 'zhang'},
+                                              'address': {'city': 'Shanghai', 'zip': '200000'}},
+                            'amount': i * 1.5, 'tags': ['a', 'b']}) for i in range(count))}
+
+
+def bench_deserialize():
+    print('--- DeserializeInstance ---')
+    doc = build_document(20000)
+    names = list(doc['items'])
+    makers = (('DeserializeInstance', DeserializeInstance),
+              ('Lazy', LazyDeserializeInstance),
+              ('Lazy slots', lambda d: LazyDeserializeInstance(d, slots=True)))
+
+    def touch_one(obj):
+        return obj.items.n100.user.name.last
+
+    def touch_all(obj):
+        items = obj.items
+        for name in names:
+            item = getattr(items, name)
+            item.user.name.last
+            item.user.address.city
+
+    print('{:>20} {:>12} {:>12} {:>12} {:>12}'.format('', 'one path(ms)', 'all(ms)',
+                                                      'again(ms)', 'memory(KB)'))
+    for title, maker in makers:
+        one = timeit(lambda: touch_one(maker(doc)), 3) * 1000
+        obj = maker(doc)
+        start = time.time()
+        touch_all(obj)
+        first = (time.time() - start) * 1000
+        again = timeit(lambda: touch_all(obj), 3) * 1000
+
+        tracemalloc.start()
+        obj = maker(doc)
+        touch_all(obj)
+        memory = tracemalloc.get_traced_memory()[0] / 1024
+        tracemalloc.stop()
+        print('{:>20} {:>12.1f} {:>12.1f} {:>12.1f} {:>12.0f}'.format(title, one, first, again,
+                                                                     memory))
+
+
+def main():
+    tmp_dir = tempfile.mkdtemp()
+    bench_yaml(tmp_dir)
+    bench_ini(tmp_dir)
+    bench_serialize()
+    bench_deserialize()
+    os.rmdir(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
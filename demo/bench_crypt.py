@@ -0,0 +1,78 @@
+# coding=utf-8
+# fish_crypt 性能测试
+# v1.2.0 create
+
+import os
+import time
+import hashlib
+import tempfile
+
+from fishbase.fish_crypt import FishHash, FishSha256, FishSigner
+
+
+def legacy_big_file(filename, algo):
+    # v1.1.9 中 FishMD5.big_file 的实现方式，每 8K 分配一个新的 bytes 对象
+    hash_obj = hashlib.new(algo)
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(8192), b''):
+            hash_obj.update(chunk)
+    return hash_obj.hexdigest()
+
+
+def timeit(func, repeat):
+    start = time.time()
+    for _ in range(repeat):
+        func()
+    return (time.time() - start) / repeat
+
+
+def bench_file_hash(tmp_dir, algo='md5'):
+    print('--- file hash, {} ---'.format(algo))
+    modes = ['mmap', 'readinto']
+    if hasattr(hashlib, 'file_digest'):
+        modes.append('file_digest')
+    print('{:>10} {:>12}'.format('size', 'legacy') + ''.join('{:>12}'.format(m) for m in modes)
+          + '  (MB/s)')
+
+    for size in (4 * 1024, 1024 * 1024, 16 * 1024 * 1024, 256 * 1024 * 1024):
+        path = os.path.join(tmp_dir, 'bench_{}.bin'.format(size))
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+        repeat = max(1, 64 * 1024 * 1024 // size)
+        mb = size / 1024.0 / 1024.0
+
+        results = [timeit(lambda: legacy_big_file(path, algo), repeat)]
+        for mode in modes:
+            results.append(timeit(lambda: FishHash.file(path, algo, mode=mode), repeat))
+        print('{:>10}'.format(size) + ''.join('{:>12.1f}'.format(mb / t) for t in results))
+        os.remove(path)
+
+
+def bench_sign(count=200000):
+    print('--- hmac sha256 sign ---')
+    secret = '12345678'
+    messages = ['GET /api/v1/orders?id={}&ts=1556676000'.format(i) for i in range(count)]
+    signer = FishSigner(secret)
+
+    def static_sign():
+        for message in messages:
+            FishSha256.hmac_sha256(secret, message)
+
+    def signer_sign():
+        for message in messages:
+            signer.sign(message)
+
+    for name, func in (('FishSha256.hmac_sha256', static_sign), ('FishSigner.sign', signer_sign),
+                       ('FishSigner.sign_many', lambda: signer.sign_many(messages))):
+        print('{:<24} {:>12.0f} signatures/sec'.format(name, count / timeit(func, 1)))
+
+
+def main():
+    tmp_dir = tempfile.mkdtemp()
+    bench_file_hash(tmp_dir)
+    os.rmdir(tmp_dir)
+    bench_sign()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# coding=utf-8
+# fish_csv 压缩读写性能测试，对比各压缩格式和压缩级别的吞吐量
+# v1.2.0 create
+
+import os
+import time
+import tempfile
+
+from fishbase.fish_csv import list2csv, csv2list
+
+
+def gen_rows(count):
+    return [[str(i), 'name_{}'.format(i), str(i * 3.14), 'some text value {}'.format(i % 97)]
+            for i in range(count)]
+
+
+def bench(rows, compression, compresslevel, path):
+    start = time.time()
+    list2csv(rows, path, compression=compression, compresslevel=compresslevel)
+    write_time = time.time() - start
+
+    start = time.time()
+    csv2list(path, compression=compression)
+    read_time = time.time() - start
+    return write_time, read_time, os.path.getsize(path)
+
+
+def main(count=200000):
+    rows = gen_rows(count)
+    tmp_dir = tempfile.mkdtemp()
+    plain_path = os.path.join(tmp_dir, 'bench.csv')
+    list2csv(rows, plain_path, compression=None)
+    raw_mb = os.path.getsize(plain_path) / 1024.0 / 1024.0
+
+    cases = [(None, None)]
+    for compression in ('gzip', 'bz2', 'xz'):
+        for level in (1, 6, 9):
+            cases.append((compression, level))
+
+    print('rows: {}, raw size: {:.2f} MB'.format(count, raw_mb))
+    print('{:<6} {:>5} {:>10} {:>14} {:>14}'.format('codec', 'level', 'ratio',
+                                                    'write MB/s', 'read MB/s'))
+    for compression, level in cases:
+        path = os.path.join(tmp_dir, 'bench_{}_{}.csv'.format(compression, level))
+        write_time, read_time, size = bench(rows, compression, level, path)
+        print('{:<6} {:>5} {:>10.2f} {:>14.2f} {:>14.2f}'.format(
+            str(compression), str(level), raw_mb * 1024 * 1024 / size,
+            raw_mb / write_time, raw_mb / read_time))
+        os.remove(path)
+
+    os.remove(plain_path)
+    os.rmdir(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# coding=utf-8
+# fish_logger 写入性能测试，统计各种 handler 每秒可以写入的日志条数
+# v1.2.0 create
+
+import os
+import time
+import logging
+import tempfile
+
+from fishbase.fish_logger import SafeFileHandler, BufferedSafeFileHandler, ProcessSafeFileHandler
+from fishbase.fish_logger import JsonFormatter
+
+_formatter = logging.Formatter('%(asctime)s %(levelname)s %(filename)s[ln:%(lineno)d] %(message)s')
+
+
+class LegacySafeFileHandler(SafeFileHandler):
+    """
+    v1.1.9 中 SafeFileHandler 的切换判断方式，每条日志都调用 strftime 和 stat
+    """
+
+    def check_base_filename(self, record):
+        time_tuple = time.localtime()
+
+        if self.suffix_time != time.strftime(self.suffix, time_tuple) or not os.path.exists(
+                self.baseFilename + '.' + self.suffix_time):
+            return 1
+        else:
+            return 0
+
+
+def bench(name, handler, count):
+    handler.setFormatter(_formatter)
+    bench_logger = logging.getLogger('bench_' + name)
+    bench_logger.propagate = False
+    bench_logger.setLevel(logging.INFO)
+    bench_logger.addHandler(handler)
+
+    start = time.time()
+    for i in range(count):
+        bench_logger.info('bench log message %d', i)
+    handler.close()
+    seconds = time.time() - start
+
+    bench_logger.removeHandler(handler)
+    print('{:<24} {:>12.0f} records/sec'.format(name, count / seconds))
+
+
+def bench_formatter(name, formatter, count):
+    record = logging.makeLogRecord({'msg': 'bench log message %d', 'args': (1,),
+                                    'levelno': logging.INFO, 'levelname': 'INFO',
+                                    'filename': 'bench_logger.py', 'lineno': 1})
+    start = time.time()
+    for i in range(count):
+        formatter.format(record)
+    seconds = time.time() - start
+    print('{:<24} {:>12.0f} records/sec'.format(name, count / seconds))
+
+
+def get_handlers(log_dir):
+    return [
+        ('legacy SafeFileHandler', LegacySafeFileHandler(os.path.join(log_dir, 'legacy.log'))),
+        ('SafeFileHandler', SafeFileHandler(os.path.join(log_dir, 'safe.log'))),
+        ('BufferedSafeFileHandler', BufferedSafeFileHandler(os.path.join(log_dir, 'buffered.log'))),
+        ('ProcessSafeFileHandler', ProcessSafeFileHandler(os.path.join(log_dir, 'process.log'))),
+    ]
+
+
+def main(count=100000):
+    log_dir = tempfile.mkdtemp()
+    for name, handler in get_handlers(log_dir):
+        bench(name, handler, count)
+    for filename in os.listdir(log_dir):
+        os.remove(os.path.join(log_dir, filename))
+    os.rmdir(log_dir)
+
+    bench_formatter('logging.Formatter', _formatter, count)
+    bench_formatter('JsonFormatter', JsonFormatter(), count)
+
+
+if __name__ == '__main__':
+    main()
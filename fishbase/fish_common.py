@@ -14,12 +14,17 @@
 import sys
 import uuid
 import copy
+import json
+import keyword
 import re
 import os
+import time
+import threading
 import warnings
 
 import yaml
 from collections import OrderedDict, namedtuple
+from types import MappingProxyType
 from operator import attrgetter
 import functools
 import pathlib
@@ -32,6 +37,17 @@ else:
     from urllib import urlencode
     from urlparse import parse_qs, urlsplit
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# 优先使用 LibYAML 的 C 实现解析 yaml，没有安装时使用纯 Python 实现
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 # uuid kind const
 udTime = 10001
 udRandom = 10002
@@ -69,6 +85,26 @@ class MyConfigParser(configparser.ConfigParser):
         return optionstr
 
 
+def _read_conf_parser(conf_filename, encoding=None, case_sensitive=False):
+    # 读入 ini 配置文件，返回 ConfigParser 对象，文件不存在或者读取错误时返回 None
+    # 检查文件是否存在
+    if not pathlib.Path(conf_filename).is_file():
+        return None
+    
+    # 判断是否对大小写敏感
+    cf = configparser.ConfigParser() if not case_sensitive else MyConfigParser()
+    
+    # 读入 config 文件
+    try:
+        if sys.version > '3':
+            cf.read(conf_filename, encoding=encoding)
+        else:
+            cf.read(conf_filename)
+    except:
+        return None
+    return cf
+
+
 # 读入配置文件，返回根据配置文件内容生成的字典类型变量，减少文件读取次数
 # 2017.2.23 #19008 create by David Yi
 # 2018.2.12 #11014 edit by David Yi, 增加返回内容，字典长度,
@@ -78,6 +114,7 @@ class MyConfigParser(configparser.ConfigParser):
 # v1.0.16 edit by Hu Jun, #94
 # v1.0.17 edit by Hu Jun, #212
 # v1.1.9 edit by Hu Jun, #222
+# v1.2.0 edit, 读取配置文件的部分移到 _read_conf_parser()，供 FishConfig 共用
 def conf_as_dict(conf_filename, encoding=None, case_sensitive=False):
     """
     读入 ini 配置文件，返回根据配置文件内容生成的字典类型变量；
@@ -138,21 +175,8 @@ def conf_as_dict(conf_filename, encoding=None, case_sensitive=False):
     """
     flag = False
     
-    # 检查文件是否存在
-    if not pathlib.Path(conf_filename).is_file():
-        return flag,
-    
-    # 判断是否对大小写敏感
-    cf = configparser.ConfigParser() if not case_sensitive else MyConfigParser()
-    
-    # 读入 config 文件
-    try:
-        if sys.version > '3':
-            cf.read(conf_filename, encoding=encoding)
-        else:
-            cf.read(conf_filename)
-    except:
-        flag = False
+    cf = _read_conf_parser(conf_filename, encoding, case_sensitive)
+    if cf is None:
         return flag,
     
     d = OrderedDict(cf._sections)
@@ -214,11 +238,375 @@ class SingleTon(object):
         return ob
 
 
+# 序列化时原样输出的基本类型
+_serialize_scalar_types = frozenset([type(None), bool, int, float, complex, str, bytes])
+_serialize_scalar_bases = (bool, int, float, complex, str, bytes)
+
+# 类的字段布局，slots 为 __slots__ 中的属性名，has_dict 为实例是否有 __dict__
+_FieldPlan = namedtuple('_FieldPlan', ['slots', 'has_dict'])
+
+# 类 -> _FieldPlan，每个类只分析一次
+_field_plans = {}
+
+
+def _get_field_plan(cls):
+    # 返回类的字段布局，沿 MRO 收集 __slots__，结果按类缓存
+    plan = _field_plans.get(cls)
+    if plan is not None:
+        return plan
+    slots = []
+    for klass in reversed(cls.__mro__):
+        names = klass.__dict__.get('__slots__', ())
+        if isinstance(names, str):
+            names = (names,)
+        for name in names:
+            if name in ('__dict__', '__weakref__') or name in slots:
+                continue
+            # 私有属性名在类中保存为 _类名__属性名
+            if name.startswith('__') and not name.endswith('__'):
+                name = '_{}{}'.format(klass.__name__.lstrip('_'), name)
+            slots.append(name)
+    plan = _FieldPlan(tuple(slots), '__dict__' in dir(cls) or not hasattr(cls, '__slots__'))
+    _field_plans[cls] = plan
+    return plan
+
+
+def _push_items(out, items, stack):
+    # out 中已经复制了 items 的内容，基本类型的值保持不变，其他值压栈等待转换后替换，
+    # 出栈顺序和 items 的顺序一致
+    start = len(stack)
+    for key, value in items:
+        if type(value) not in _serialize_scalar_types:
+            stack.append((out, key, value))
+    if len(stack) - start > 1:
+        stack[start:] = stack[start:][::-1]
+
+
+# 对象没有设置的 __slots__ 属性
+_missing_field = object()
+
+# 反序列化时标记需要给 __slots__ 属性赋值的栈元素
+_apply_slots = object()
+
+# 序列化时标记对象的属性已经处理完成的栈元素
+_leave_object = object()
+
+
+# v1.2.0 create
+class FishSerializer(object):
+    """
+    对象序列化引擎，把对象转换为由 dict、list 和基本类型组成的结构，可以直接输出为 json 或 msgpack 字节串，
+    并可以反序列化为注册过的类的实例；
+    支持 __dict__ 和 __slots__ 的类，每个类的字段布局只分析一次；
+    refs 为 True 时，同一个对象被多次引用或者循环引用时只序列化一次，第一次出现的位置增加 id_key，
+    之后的位置输出为 {ref_key: id}；refs 为 False 时，共享的对象每次都完整序列化，只有循环引用输出为 {ref_key: id}；
+    dict、list 等容器同样处理，被引用的容器第一次出现的位置输出为 {id_key: id, items_key: 容器}；
+    只有 id_key 和 items_key 两个 key 的 dict 会被当作被引用的容器，普通数据中应避免；
+    使用显式的栈处理，不受递归深度限制
+
+    :param:
+        * classes: (list) 反序列化时需要重建的类，默认为 None，也可以之后调用 register() 注册
+        * class_key: (string) 保存类名的 key，默认为 '__classname__'
+        * id_key: (string) 保存被引用对象 id 的 key，默认为 '__id__'
+        * ref_key: (string) 保存引用对象 id 的 key，默认为 '__ref__'
+        * items_key: (string) 被引用的容器保存内容的 key，默认为 '__items__'
+        * default: (function) 无法序列化的对象的转换函数，返回可以序列化的值，默认为 None 抛出 TypeError
+        * refs: (bool) 共享的对象是否只序列化一次，默认为 True
+        * containers: (bool) 是否处理 dict、list、tuple、set 中的对象，默认为 True，tuple、set 输出为 list；
+          为 False 时这些容器原样输出
+
+    举例如下::
+
+        print('--- FishSerializer demo ---')
+        class Node(object):
+            __slots__ = ('name', 'next')
+
+            def __init__(self, name, next=None):
+                self.name = name
+                self.next = next
+
+        serializer = FishSerializer(classes=[Node])
+        a = Node('a')
+        a.next = Node('b', a)
+        data = serializer.dumps(a)
+        print(data)
+        new_a = serializer.loads(data)
+        print(new_a.next.name, new_a.next.next is new_a)
+        print('---')
+
+    执行结果::
+
+        --- FishSerializer demo ---
+        b'{"__classname__":"Node","name":"a","next":{"__classname__":"Node","name":"b","next":{"__ref__":0}},"__id__":0}'
+        b True
+        ---
+
+    """
+
+    def __init__(self, classes=None, class_key='__classname__', id_key='__id__',
+                 ref_key='__ref__', default=None, refs=True, containers=True, items_key='__items__'):
+        self.class_key = class_key
+        self.id_key = id_key
+        self.ref_key = ref_key
+        self.items_key = items_key
+        self.default = default
+        self.refs = refs
+        self.containers = containers
+        # 类名 -> 类，类 -> 类名
+        self._classes = {}
+        self._names = {}
+        for cls in classes or ():
+            self.register(cls)
+
+    def register(self, cls, name=None):
+        """
+        注册反序列化时需要重建的类，可以作为类装饰器使用
+
+        :param:
+            * cls: (class) 需要注册的类
+            * name: (string) 序列化时使用的类名，默认为 None 使用 cls.__name__
+        :return:
+            * cls: (class) 注册的类
+        """
+        name = name or cls.__name__
+        self._classes[name] = cls
+        self._names[cls] = name
+        return cls
+
+    def to_dict(self, obj):
+        """
+        把对象序列化为由 dict、list 和基本类型组成的结构
+
+        :param:
+            * obj: (object) 需要序列化的对象
+        :return:
+            * data: 序列化后的结构，对象转换为 dict，containers 为 True 时 tuple、set 转换为 list
+        """
+        # id(对象) -> 输出的 dict 或 list；refs 为 False 时只保存正在处理的对象，用来检测循环引用
+        memo = {}
+        # id(输出的 dict 或 list) -> 编号
+        numbers = {}
+        # id(输出的容器) -> 容器第一次出现的位置 (target, key)，被引用时在该位置替换为带 id_key 的 dict
+        places = {}
+        # default 返回的临时对象，保存引用避免被回收后 id 被复用
+        keep = []
+        root = [None]
+        stack = [(root, 0, obj)]
+        encode = self._encode
+        while stack:
+            target, key, value = stack.pop()
+            if target is _leave_object:
+                # 对象的所有属性处理完成
+                memo.pop(key, None)
+            elif type(value) in _serialize_scalar_types:
+                target[key] = value
+            else:
+                target[key] = encode(value, target, key, memo, numbers, places, keep, stack)
+        return root[0]
+
+    def _encode(self, value, target, key, memo, numbers, places, keep, stack):
+        out = memo.get(id(value))
+        if out is not None:
+            # 再次出现时输出引用，对象在第一次出现的位置增加 id_key，
+            # 容器第一次出现的位置替换为 {id_key: 编号, items_key: 容器}
+            place = places.get(id(out))
+            number = numbers.get(id(out))
+            if place is None:
+                out[self.id_key] = number
+            elif number is None:
+                number = numbers[id(out)] = len(numbers)
+                place[0][place[1]] = {self.id_key: number, self.items_key: out}
+            return {self.ref_key: number}
+
+        if isinstance(value, _serialize_scalar_bases):
+            return value
+
+        cls = type(value)
+        if isinstance(value, dict):
+            if not self.containers:
+                return value
+            out = memo[id(value)] = dict(value)
+            places[id(out)] = (target, key)
+            if not self.refs:
+                stack.append((_leave_object, id(value), None))
+            _push_items(out, out.items(), stack)
+            return out
+
+        if isinstance(value, (list, tuple, set, frozenset)):
+            if not self.containers:
+                return value
+            out = memo[id(value)] = list(value)
+            places[id(out)] = (target, key)
+            if not self.refs:
+                stack.append((_leave_object, id(value), None))
+            _push_items(out, enumerate(out), stack)
+            return out
+
+        plan = _field_plans.get(cls) or _get_field_plan(cls)
+        instance_dict = getattr(value, '__dict__', None) if plan.has_dict else None
+        if instance_dict is None and not plan.slots:
+            # 没有 __dict__ 和 __slots__ 的对象，比如 datetime，交给 default 转换
+            if self.default is None:
+                raise TypeError('Object of type {} is not serializable'.format(cls.__name__))
+            converted = self.default(value)
+            if type(converted) in _serialize_scalar_types:
+                return converted
+            keep.append(converted)
+            out = self._encode(converted, target, key, memo, numbers, places, keep, stack)
+            if self.refs:
+                memo[id(value)] = out
+            return out
+
+        out = {self.class_key: self._names.get(cls) or cls.__name__}
+        for name in plan.slots:
+            field = getattr(value, name, _missing_field)
+            if field is not _missing_field:
+                out[name] = field
+        if instance_dict:
+            out.update(instance_dict)
+        memo[id(value)] = out
+        numbers[id(out)] = len(numbers)
+        if not self.refs:
+            # 属性处理完成后从 memo 中删除，之后再出现时重新完整序列化
+            stack.append((_leave_object, id(value), None))
+        _push_items(out, out.items(), stack)
+        return out
+
+    def from_dict(self, data):
+        """
+        把 to_dict() 的结果反序列化为对象，注册过的类重建为该类的实例，不调用 __init__；
+        未注册的类重建为 DeserializeInstance 对象，保留类名属性；不含类名的 dict 保持为 dict
+
+        :param:
+            * data: to_dict() 返回的结构
+        :return:
+            * obj: 反序列化后的对象
+        """
+        # 编号 -> 已经重建的对象
+        refs = {}
+        root = [None]
+        stack = [(root, 0, data)]
+        decode = self._decode
+        while stack:
+            target, key, value = stack.pop()
+            if target is _apply_slots:
+                # 所有属性处理完成后，给 __slots__ 对象赋值
+                for name, field in value.items():
+                    setattr(key, name, field)
+            elif type(value) in _serialize_scalar_types:
+                target[key] = value
+            else:
+                target[key] = decode(value, refs, stack)
+        return root[0]
+
+    def _decode(self, value, refs, stack):
+        if isinstance(value, list):
+            out = list(value)
+            _push_items(out, enumerate(out), stack)
+            return out
+
+        if not isinstance(value, dict):
+            return value
+
+        if self.ref_key in value and len(value) == 1:
+            try:
+                return refs[value[self.ref_key]]
+            except KeyError:
+                raise ValueError('unknown reference {}'.format(value[self.ref_key]))
+
+        if len(value) == 2 and self.items_key in value and self.id_key in value:
+            # 被引用的容器，先登记再处理内容，内容中的循环引用可以找到自己
+            items = value[self.items_key]
+            if isinstance(items, list):
+                out = refs[value[self.id_key]] = list(items)
+                _push_items(out, enumerate(out), stack)
+            else:
+                out = refs[value[self.id_key]] = dict(items)
+                _push_items(out, out.items(), stack)
+            return out
+
+        class_name = value.get(self.class_key)
+        if class_name is None:
+            out = dict(value)
+            _push_items(out, out.items(), stack)
+            return out
+
+        cls = self._classes.get(class_name)
+        skip = (self.class_key, self.id_key)
+        if cls is None:
+            obj = DeserializeInstance.__new__(DeserializeInstance)
+            skip = (self.id_key,)
+        else:
+            obj = cls.__new__(cls)
+        number = value.get(self.id_key)
+        if number is not None:
+            refs[number] = obj
+
+        if _get_field_plan(type(obj)).slots:
+            attrs = {}
+            stack.append((_apply_slots, obj, attrs))
+        else:
+            attrs = obj.__dict__
+        attrs.update(value)
+        for k in skip:
+            attrs.pop(k, None)
+        _push_items(attrs, attrs.items(), stack)
+        return obj
+
+    def dumps(self, obj, fmt='json'):
+        """
+        把对象序列化为 json 或 msgpack 字节串
+
+        :param:
+            * obj: (object) 需要序列化的对象
+            * fmt: (string) 输出格式，'json' 或 'msgpack'，msgpack 需要安装 msgpack，默认为 'json'
+        :return:
+            * data: (bytes) 序列化后的字节串，json 为 utf-8 编码
+        """
+        data = self.to_dict(obj)
+        if fmt == 'json':
+            return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if fmt == 'msgpack':
+            if msgpack is None:
+                raise ValueError('msgpack format is not supported, msgpack module not found')
+            return msgpack.packb(data, use_bin_type=True)
+        raise ValueError('fmt should be json or msgpack, but we got {}'.format(fmt))
+
+    def loads(self, data, fmt='json'):
+        """
+        把 dumps() 输出的字节串反序列化为对象
+
+        :param:
+            * data: (bytes) json 或 msgpack 字节串
+            * fmt: (string) 输入格式，'json' 或 'msgpack'，默认为 'json'
+        :return:
+            * obj: 反序列化后的对象
+        """
+        if fmt == 'json':
+            if isinstance(data, bytes):
+                data = data.decode('utf-8')
+            return self.from_dict(json.loads(data))
+        if fmt == 'msgpack':
+            if msgpack is None:
+                raise ValueError('msgpack format is not supported, msgpack module not found')
+            return self.from_dict(msgpack.unpackb(data, raw=False))
+        raise ValueError('fmt should be json or msgpack, but we got {}'.format(fmt))
+
+
+_fish_serializer = FishSerializer()
+
+# serialize_instance() 使用，保持 v1.2.0 之前的输出格式
+_instance_serializer = FishSerializer(refs=False, containers=False)
+
+
 # 2015.6.14  edit by david.yi
 # 2019.03.19 v1.1.7 edit by Hu Jun, edit from Jia Chunying，#215
+# v1.2.0 edit, 使用 FishSerializer，支持 __slots__ 和循环引用
 def serialize_instance(obj):
     """
-    对象序列化
+    对象序列化，支持 __slots__ 的类；对象的属性中，基本类型和 list、tuple、set、dict 原样输出，其他对象递归序列化；
+    共享的对象每次都完整序列化，循环引用时被引用的对象增加 '__id__'，引用的位置输出为 {'__ref__': id}；
+    需要共享引用只序列化一次或者处理容器中的对象时，使用 FishSerializer
 
     :param:
         * obj: (object) 对象实例
@@ -254,15 +642,7 @@ def serialize_instance(obj):
         ---
 
     """
-    obj_dict = {'__classname__': type(obj).__name__}
-    obj_dict.update(obj.__dict__)
-    for key, value in obj_dict.items():
-        if not isinstance(value, commonDataType):
-            sub_dict = serialize_instance(value)
-            obj_dict.update({key: sub_dict})
-        else:
-            continue
-    return obj_dict
+    return _instance_serializer.to_dict(obj)
 
 
 # 2019.03.28 v1.1.8 edit by Hu Jun, edit from Jia Chunying，#215
@@ -304,6 +684,148 @@ class DeserializeInstance(object):
                 setattr(self, key, value)
 
 
+# v1.2.0 create
+def deserialize_instance(obj_dict, classes=None):
+    """
+    对象反序列化，serialize_instance() 的逆操作，共享引用和循环引用会还原为同一个对象
+
+    :param:
+        * obj_dict: (dict) serialize_instance() 返回的对象序列化字典
+        * classes: (list) 需要重建的类，按类名匹配，默认为 None；未匹配的对象重建为 DeserializeInstance 对象
+
+    :return:
+        * obj: (object) 对象
+
+    举例如下::
+
+        print('--- deserialize_instance demo ---')
+        class Obj(object):
+            def __init__(self, a, b):
+                self.a = a
+                self.b = b
+
+        obj_ = Obj(1, [1, 2])
+        obj_.c = obj_
+        new_obj = deserialize_instance(serialize_instance(obj_), classes=[Obj])
+        print(type(new_obj).__name__, new_obj.a, new_obj.b, new_obj.c is new_obj)
+        print('---')
+
+    执行结果::
+
+        --- deserialize_instance demo ---
+        Obj 1 [1, 2] True
+        ---
+
+    """
+    serializer = FishSerializer(classes=classes) if classes else _fish_serializer
+    return serializer.from_dict(obj_dict)
+
+
+# 按 key 集合生成的 __slots__ 类，key 为字段名的 tuple
+_lazy_slots_classes = {}
+
+# 最多生成的 __slots__ 类数量，超过后使用 LazyDeserializeInstance 本身
+lazy_slots_class_limit = 1024
+
+
+def _lazy_slots_class(keys):
+    # 返回 key 集合对应的 __slots__ 子类，合法的标识符才能作为 slot，其他 key 仍然缓存在字典中
+    cls = _lazy_slots_classes.get(keys)
+    if cls is not None:
+        return cls
+    if len(_lazy_slots_classes) >= lazy_slots_class_limit:
+        return LazyDeserializeInstance
+    fields = tuple(key for key in keys if isinstance(key, str) and key.isidentifier() and
+                   not keyword.iskeyword(key) and not key.startswith('__') and
+                   not hasattr(LazyDeserializeInstance, key))
+    cls = type('LazyDeserializeInstance', (LazyDeserializeInstance,), {'__slots__': fields})
+    _lazy_slots_classes[keys] = cls
+    return cls
+
+
+def _lazy_value(value, slots):
+    # dict 包装为 LazyDeserializeInstance，list 中的 dict 同样包装，其他值原样返回
+    if isinstance(value, dict):
+        # 直接创建实例并赋值，省去 __new__ 和 __init__ 的调用
+        obj = object.__new__(_lazy_slots_class(tuple(value)) if slots else
+                             LazyDeserializeInstance)
+        obj._lazy_dict = value
+        obj._lazy_slots = slots
+        return obj
+    if isinstance(value, list):
+        return [_lazy_value(item, slots) for item in value]
+    return value
+
+
+# v1.2.0 create
+class LazyDeserializeInstance(object):
+    """
+    延迟的字典对象反序列化，和 DeserializeInstance 一样用属性访问字典内容，但是不复制字典，
+    只在第一次访问属性时才把嵌套的字典包装为 LazyDeserializeInstance 并缓存，适合只访问部分内容的大字典；
+    slots 为 True 时，按每个字典的 key 集合生成 __slots__ 子类，访问过的属性保存在 slot 中，
+    之后的访问不再经过 __getattr__，相同结构的节点较多时更快、占用内存更少
+
+    :param:
+        * obj_dict: (dict) 对象序列化字典
+        * slots: (bool) 是否按 key 集合生成 __slots__ 子类，默认为 False
+
+    :return:
+        * obj: (object) 对象
+
+    举例如下::
+
+        print('--- LazyDeserializeInstance demo ---')
+        temp_dict = {'user': {'name': {'last_name': 'zhang', 'first_name': 'san'}, 'address': 'Beijing'},
+                     'orders': [{'id': 1}, {'id': 2}]}
+        new_obj = LazyDeserializeInstance(temp_dict, slots=True)
+        print('last_name is: ', new_obj.user.name.last_name)
+        print('address is: ', new_obj.user.address)
+        print('order id is: ', new_obj.orders[1].id)
+        print('---')
+
+    执行结果::
+
+        --- LazyDeserializeInstance demo ---
+        last_name is:  zhang
+        address is:  Beijing
+        order id is:  2
+        ---
+
+    """
+    # 访问过的属性保存在实例的 __dict__ 或者生成的 slot 中，之后由正常的属性查找直接返回
+    __slots__ = ('_lazy_dict', '_lazy_slots', '__dict__')
+
+    def __new__(cls, obj_dict, slots=False):
+        if slots and cls is LazyDeserializeInstance:
+            cls = _lazy_slots_class(tuple(obj_dict))
+        return object.__new__(cls)
+
+    def __init__(self, obj_dict, slots=False):
+        self._lazy_dict = obj_dict
+        self._lazy_slots = slots
+
+    def __getattr__(self, name):
+        # 只有正常的属性查找失败时才会调用，生成的 slot 未赋值时也会调用
+        if name.startswith('__') or name in LazyDeserializeInstance.__slots__:
+            raise AttributeError(name)
+        try:
+            value = self._lazy_dict[name]
+        except KeyError:
+            raise AttributeError("'{}' object has no attribute '{}'".format(
+                type(self).__name__, name))
+        value = _lazy_value(value, self._lazy_slots)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        keys = set(self._lazy_dict)
+        keys.update(self.__dict__)
+        return sorted(str(key) for key in keys)
+
+    def __repr__(self):
+        return '<LazyDeserializeInstance {}>'.format(list(self._lazy_dict))
+
+
 # 2018.5.26 v1.0.13 edit by David Yi，#19038
 def get_uuid(kind):
     """
@@ -465,16 +987,183 @@ def fish_isalpha(source):
 # r2c1 v1.0.1 #12089
 # 2016.4.3 edit class and function name
 # 通过conf文件。eg ini，读取值，通过字典缓存来提高读取速度
-class FishCache:
-    __cache = {}
-    
+# v1.2.0 edit, 改为有容量上限的 LRU 缓存，支持过期时间、按前缀或来源对象清除、统计信息和函数装饰器
+class FishCache(object):
+    """
+    线程安全的 LRU 缓存，超过 maxsize 时淘汰最久未使用的条目，每个条目可以设置过期时间；
+    key 建议使用 tuple，可以按 key 的前缀或者写入时指定的来源对象批量清除；
+    也可以通过 memoize() 作为函数的缓存装饰器
+
+    :param:
+        * maxsize: (int) 最多缓存的条目数，默认为 1024，None 表示不限制
+        * ttl: (float) 默认的过期秒数，默认为 None 不过期
+
+    举例如下::
+
+        print('--- FishCache demo ---')
+        cache = FishCache(maxsize=100, ttl=60)
+        cache.set(('user', 1), 'david')
+        print(cache.get(('user', 1)))
+
+        # 读取配置文件中的值并缓存，配置变化后按来源对象清除
+        ds = conf_as_dict('test_conf.ini')
+        print(cache.get_cf_cache(ds[1], 'show_opt', 'short_opt'))
+        cache.invalidate(source=ds[1])
+
+        @cache.memoize(ttl=10)
+        def add(a, b):
+            return a + b
+
+        print(add(1, 2))
+        print(cache.stats())
+        print('---')
+
+    执行结果::
+
+        --- FishCache demo ---
+        david
+        b:d:v:p:f:
+        3
+        {'hits': 1, 'misses': 2, 'evictions': 0, 'expirations': 0, 'size': 2}
+        ---
+
+    """
+
+    _missing = object()
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # key -> (value, 过期时间, 来源对象)，保存来源对象本身，避免对象被回收后 id 被新对象复用
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self._timer = getattr(time, 'monotonic', time.time)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, self._missing) is not self._missing
+
+    def get(self, key, default=None):
+        """
+        获取缓存的值，不存在或已过期时返回 default
+        """
+        with self._lock:
+            item = self._data.get(key, self._missing)
+            if item is not self._missing and item[1] is not None and item[1] <= self._timer():
+                del self._data[key]
+                self.expirations += 1
+                item = self._missing
+            if item is self._missing:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, ttl=None, source=None):
+        """
+        写入缓存
+
+        :param:
+            * key: (hashable) 缓存的 key，建议使用 tuple
+            * value: (object) 缓存的值
+            * ttl: (float) 过期秒数，默认为 None 使用初始化时的 ttl
+            * source: (object) 来源对象，之后可以通过 invalidate(source=...) 清除来自这个对象的所有条目
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expire_at = self._timer() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expire_at, source)
+            self._data.move_to_end(key)
+            while self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key, func, ttl=None, source=None):
+        """
+        获取缓存的值，不存在时调用 func() 计算并写入缓存
+        """
+        value = self.get(key, self._missing)
+        if value is self._missing:
+            value = func()
+            self.set(key, value, ttl=ttl, source=source)
+        return value
+
     def get_cf_cache(self, cf, section, key):
-        # 生成 key，用于 dict
-        temp_key = section + '_' + key
-        
-        if temp_key not in self.__cache:
-            self.__cache[temp_key] = cf[section][key]
-        return self.__cache[temp_key]
+        """
+        获取配置中 section 下 key 的值并缓存，cf 可以是 conf_as_dict() 返回的字典或者 ConfigParser 对象；
+        缓存条目保存 cf 的引用，条目淘汰或清除之前 cf 不会被回收，重新读取的配置不会命中旧的值
+
+        :param:
+            * cf: (dict) 配置
+            * section: (string) section 名称
+            * key: (string) key 名称
+        :return:
+            * value: 配置的值
+        """
+        return self.get_or_set(('cf', id(cf), section, key), lambda: cf[section][key], source=cf)
+
+    def invalidate(self, prefix=None, source=None):
+        """
+        清除缓存，不指定参数时清除所有条目
+
+        :param:
+            * prefix: (tuple) 清除 key 以 prefix 开头的 tuple key
+            * source: (object) 清除 set() 时指定为这个来源对象的条目
+        :return:
+            * count: (int) 清除的条目数
+        """
+        with self._lock:
+            if prefix is None and source is None:
+                count = len(self._data)
+                self._data.clear()
+                return count
+            keys = [k for k, item in self._data.items()
+                    if (prefix is not None and isinstance(k, tuple) and
+                        k[:len(prefix)] == tuple(prefix)) or
+                    (source is not None and item[2] is source)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self):
+        """
+        获取缓存统计
+
+        :return:
+            * stats: (dict) hits 命中次数，misses 未命中次数，evictions 淘汰次数，expirations 过期次数，size 条目数
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'expirations': self.expirations, 'size': len(self._data)}
+
+    def memoize(self, ttl=None):
+        """
+        函数缓存装饰器，以函数和参数作为 key；被装饰的函数增加 invalidate() 方法，清除这个函数的所有缓存
+
+        :param:
+            * ttl: (float) 过期秒数，默认为 None 使用初始化时的 ttl
+        """
+        def decorator(func):
+            func_key = (func.__module__, getattr(func, '__qualname__', func.__name__))
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = (func_key, args, tuple(sorted(kwargs.items())))
+                return self.get_or_set(key, lambda: func(*args, **kwargs), ttl=ttl)
+
+            wrapper.invalidate = lambda: self.invalidate(prefix=(func_key,))
+            return wrapper
+        return decorator
 
 
 # 2019.01.06 edit by Hu Jun, #152
@@ -1095,9 +1784,10 @@ def find_same_between_dicts(dict1, dict2):
 
 # v1.1.3 edit by Hu Jun, #94
 # v1.0.17 edit by Hu Jun, #212
+# v1.2.0 edit, 使用 CSafeLoader 直接从文件对象解析
 def yaml_conf_as_dict(file_path, encoding=None):
     """
-    读入 yaml 配置文件，返回根据配置文件内容生成的字典类型变量
+    读入 yaml 配置文件，返回根据配置文件内容生成的字典类型变量；安装了 LibYAML 时使用 C 实现的 CSafeLoader 解析
 
     :param:
         * file_path: (string) 需要读入的 yaml 配置文件长文件名
@@ -1139,16 +1829,552 @@ def yaml_conf_as_dict(file_path, encoding=None):
     try:
         if sys.version > '3':
             with open(file_path, 'r', encoding=encoding) as f:
-                d = OrderedDict(yaml.load(f.read()))
+                d = OrderedDict(yaml.load(f, Loader=YamlLoader))
                 return True, d, 'Success'
         else:
             with open(file_path, 'r') as f:
-                d = OrderedDict(yaml.load(f.read()))
+                d = OrderedDict(yaml.load(f, Loader=YamlLoader))
                 return True, d, 'Success'
     except:
         return False, {}, 'Unknow error'
 
 
+def _freeze(value):
+    # 把 dict、list、set 递归转换为只读的 MappingProxyType、tuple、frozenset
+    if isinstance(value, dict):
+        return MappingProxyType(OrderedDict((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+# v1.2.0 create
+class ConfigCache(object):
+    """
+    配置文件解析结果的缓存，以文件绝对路径和读取参数为 key，文件的修改时间和大小不变时直接返回缓存的结果，
+    文件变化后重新解析；可以开启后台线程定时检查文件变化，此时读取缓存不再检查文件；
+    返回的字典为只读的 MappingProxyType，列表转为 tuple，调用方无法修改共享的缓存内容
+
+    :param:
+        * poll_interval: (float) 后台线程检查文件变化的间隔秒数，默认为 None 不开启后台线程，每次读取时检查
+
+    举例如下::
+
+        print('--- ConfigCache demo ---')
+        config_cache = ConfigCache()
+        ds = config_cache.conf_as_dict('test_conf.ini')
+        print('flag:', ds[0])
+        print('section show_opt, key short_opt:', ds[1]['show_opt']['short_opt'])
+        ds = config_cache.yaml_conf_as_dict('test_conf.yaml', encoding='utf-8')
+        print('conf info: ', ds[1].get('project'))
+        print(config_cache.stats())
+        print('---')
+
+    执行结果::
+
+        --- ConfigCache demo ---
+        flag: True
+        section show_opt, key short_opt: b:d:v:p:f:
+        conf info:  hellopackage
+        {'hits': 0, 'misses': 2, 'reloads': 0, 'size': 2}
+        ---
+
+    """
+
+    def __init__(self, poll_interval=None):
+        self.poll_interval = poll_interval
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        # key -> [(mtime, size), result, loader, args, kwargs]
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watch_thread = None
+        if poll_interval:
+            self._watch_thread = threading.Thread(target=self._watch)
+            self._watch_thread.daemon = True
+            self._watch_thread.start()
+
+    @staticmethod
+    def _file_state(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return getattr(st, 'st_mtime_ns', st.st_mtime), st.st_size
+
+    @staticmethod
+    def _freeze_result(result):
+        return (result[0], _freeze(result[1])) + tuple(result[2:])
+
+    def get(self, loader, path, *args, **kwargs):
+        """
+        通过 loader 读取配置文件，文件未变化时返回缓存的结果
+
+        :param:
+            * loader: (function) 读取函数，比如 conf_as_dict、yaml_conf_as_dict，返回值第一项为是否成功，第二项为内容
+            * path: (string) 配置文件名
+            * args, kwargs: 传给 loader 的其他参数
+        :return:
+            * result: (tuple) loader 的返回值，读取成功时其中的内容为只读
+        """
+        abs_path = os.path.abspath(path)
+        key = (abs_path, loader, args, tuple(sorted(kwargs.items())))
+
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and (self._watch_thread is not None or
+                                  self._file_state(abs_path) == entry[0]):
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+
+        state = self._file_state(abs_path)
+        result = loader(abs_path, *args, **kwargs)
+        with self._lock:
+            self.misses += 1
+            # 读取失败的结果不缓存
+            if not result[0]:
+                self._cache.pop(key, None)
+                return result
+            result = self._freeze_result(result)
+            self._cache[key] = [state, result, loader, args, kwargs]
+        return result
+
+    def conf_as_dict(self, conf_filename, encoding=None, case_sensitive=False):
+        """
+        带缓存的 conf_as_dict()，参数和返回值与 conf_as_dict() 相同，返回的字典为只读
+        """
+        return self.get(conf_as_dict, conf_filename, encoding=encoding,
+                        case_sensitive=case_sensitive)
+
+    def yaml_conf_as_dict(self, file_path, encoding=None):
+        """
+        带缓存的 yaml_conf_as_dict()，参数和返回值与 yaml_conf_as_dict() 相同，返回的字典为只读
+        """
+        return self.get(yaml_conf_as_dict, file_path, encoding=encoding)
+
+    def invalidate(self, path=None):
+        """
+        清除缓存
+
+        :param:
+            * path: (string) 需要清除缓存的配置文件名，默认为 None 清除所有缓存
+        """
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+                return
+            abs_path = os.path.abspath(path)
+            for key in [k for k in self._cache if k[0] == abs_path]:
+                del self._cache[key]
+
+    def stats(self):
+        """
+        获取缓存统计
+
+        :return:
+            * stats: (dict) hits 命中次数，misses 未命中次数，reloads 后台线程重新解析次数，size 缓存数量
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'reloads': self.reloads,
+                    'size': len(self._cache)}
+
+    def reload_changed(self):
+        """
+        检查所有缓存的配置文件，重新解析有变化的文件，后台线程定时调用
+        """
+        with self._lock:
+            items = list(self._cache.items())
+        for key, (state, _, loader, args, kwargs) in items:
+            new_state = self._file_state(key[0])
+            if new_state == state:
+                continue
+            result = loader(key[0], *args, **kwargs) if new_state is not None else (False,)
+            with self._lock:
+                self.reloads += 1
+                if not result[0]:
+                    self._cache.pop(key, None)
+                else:
+                    self._cache[key] = [new_state, self._freeze_result(result), loader, args,
+                                        kwargs]
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.reload_changed()
+            except Exception:
+                pass
+
+    def stop(self):
+        """
+        停止后台检查线程，之后每次读取时检查文件变化
+        """
+        self._stop_event.set()
+        self._watch_thread = None
+
+
+_config_missing = object()
+
+
+def _split_config_list(value, sep):
+    # 按分隔符切分配置的值，去掉每一项前后的空格和空项
+    return [item.strip() for item in value.split(sep) if item.strip()]
+
+
+# v1.2.0 create
+class FishConfigSection(object):
+    """
+    FishConfig 中的一个 section，由 FishConfig 在第一次访问时创建，不需要直接实例化；
+    可以用属性或者下标读取 key 的字符串值，get_int()、get_float()、get_bool()、get_list() 的类型转换结果按 key 缓存；
+    key 和 get、get_int 等方法同名时，用下标读取，比如 section['get']
+
+    :param:
+        * config: (FishConfig) 所属的 FishConfig 对象
+        * name: (string) section 名称
+        * raw: (dict) 合并了 DEFAULT 内容的 section 字典
+    """
+
+    def __init__(self, config, name, raw):
+        self._config = config
+        self._name = name
+        self._raw = raw
+        # (key, kind, sep) -> 转换后的值
+        self._cache = {}
+
+    def __getattr__(self, key):
+        if key.startswith('_'):
+            raise AttributeError(key)
+        value = self._value(key)
+        if value is None:
+            raise AttributeError('section {} has no key {}'.format(self._name, key))
+        return value
+
+    def __getitem__(self, key):
+        value = self._value(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self._value(key) is not None
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def __repr__(self):
+        return '<FishConfigSection {}>'.format(self._name)
+
+    def section_name(self):
+        """
+        返回 section 名称
+        """
+        return self._name
+
+    def _value(self, key):
+        value = self._cache.get((key, 'str', None))
+        if value is not None:
+            return value
+        value = self._raw.get(self._config._optionxform(key))
+        env_name = self._config._env_name(self._name, self._config._optionxform(key))
+        if env_name is not None and env_name in os.environ:
+            value = os.environ[env_name]
+        if value is not None:
+            self._cache[(key, 'str', None)] = value
+        return value
+
+    def _convert(self, key, kind, sep, converter, default):
+        # 以调用方传入的 key 缓存，命中时不需要再做 optionxform 和环境变量检查
+        result = self._cache.get((key, kind, sep), _config_missing)
+        if result is not _config_missing:
+            return result
+        value = self._value(key)
+        if value is None:
+            return default
+        result = converter(value, sep) if sep is not None else converter(value)
+        self._cache[(key, kind, sep)] = result
+        return result
+
+    def get(self, key, default=None):
+        """
+        读取 key 的字符串值
+
+        :param:
+            * key: (string) key 名称
+            * default: 不存在该 key 时返回的值，默认为 None
+        :return:
+            * value: (string) key 的值，设置了环境变量时为环境变量的值
+        """
+        value = self._value(key)
+        return default if value is None else value
+
+    def get_int(self, key, default=None):
+        """
+        读取 key 的值并转换为 int，转换失败时抛出 ValueError
+
+        :param:
+            * key: (string) key 名称
+            * default: 不存在该 key 时返回的值，默认为 None
+        :return:
+            * value: (int) key 的值
+        """
+        return self._convert(key, 'int', None, int, default)
+
+    def get_float(self, key, default=None):
+        """
+        读取 key 的值并转换为 float，转换失败时抛出 ValueError
+
+        :param:
+            * key: (string) key 名称
+            * default: 不存在该 key 时返回的值，默认为 None
+        :return:
+            * value: (float) key 的值
+        """
+        return self._convert(key, 'float', None, float, default)
+
+    def get_bool(self, key, default=None):
+        """
+        读取 key 的值并转换为 bool，取值范围由 FishConfig 的 true_values、false_values 决定，
+        不在范围内时抛出 ValueError
+
+        :param:
+            * key: (string) key 名称
+            * default: 不存在该 key 时返回的值，默认为 None
+        :return:
+            * value: (bool) key 的值
+        """
+        return self._convert(key, 'bool', None, self._config._to_bool, default)
+
+    def get_list(self, key, default=None, sep=None):
+        """
+        读取 key 的值，按分隔符切分为 list，去掉每一项前后的空格和空项
+
+        :param:
+            * key: (string) key 名称
+            * default: 不存在该 key 时返回的值，默认为 None
+            * sep: (string) 分隔符，默认为 None 使用 FishConfig 的 list_sep
+        :return:
+            * value: (list) key 的值切分后的列表
+        """
+        sep = sep or self._config.list_sep
+        result = self._convert(key, 'list', sep, _split_config_list, default)
+        # 返回副本，避免调用方修改缓存的列表
+        return list(result) if result is not default else result
+
+    def as_dict(self):
+        """
+        返回 section 内容的字典，包括环境变量覆盖后的值
+
+        :return:
+            * d: (OrderedDict) section 的内容
+        """
+        return OrderedDict((k, self._value(k)) for k in self._raw)
+
+
+# v1.2.0 create
+class FishConfig(object):
+    """
+    属性方式访问的 ini 配置文件对象，读取方式和 conf_as_dict() 相同；
+    section 在第一次访问时才合并 DEFAULT 的内容，类型转换的结果按 key 缓存，
+    支持 'section.key' 形式的路径读取，支持用环境变量覆盖配置文件中的值；
+    读取成功时对象的布尔值为 True；section 和方法同名时，用下标读取，比如 cfg['get']
+
+    :param:
+        * conf_filename: (string) 需要读入的 ini 配置文件长文件名
+        * encoding: (string) 文件编码
+        * case_sensitive: (bool) 是否大小写敏感，默认为 False
+        * env_prefix: (string) 环境变量前缀，默认为 None 不读取环境变量；设置后，环境变量
+          {env_prefix}{SECTION}_{KEY} 存在时覆盖配置文件中的值，名称为大写，非字母数字的字符替换为 _
+        * list_sep: (string) get_list() 默认的分隔符，默认为 ','
+        * true_values: (tuple) get_bool() 认为是 True 的值，不区分大小写
+        * false_values: (tuple) get_bool() 认为是 False 的值，不区分大小写
+
+    举例如下::
+
+        print('--- FishConfig demo ---')
+        cfg = FishConfig('test_conf.ini', env_prefix='APP_')
+        print('flag:', bool(cfg))
+        print('section show_opt, key short_opt:', cfg.show_opt.short_opt)
+        print('erule_count:', cfg.get_int('get_extra_rules.erule_count'))
+        print('args:', cfg.get_args.get_list('args'))
+        os.environ['APP_GET_ARGS_ARGS'] = 'download'
+        print('args:', FishConfig('test_conf.ini', env_prefix='APP_').get_list('get_args.args'))
+        print('---')
+
+    执行结果::
+
+        --- FishConfig demo ---
+        flag: True
+        section show_opt, key short_opt: b:d:v:p:f:
+        erule_count: 2
+        args: ['download', 'test']
+        args: ['download']
+        ---
+
+    """
+
+    def __init__(self, conf_filename, encoding=None, case_sensitive=False, env_prefix=None,
+                 list_sep=',', true_values=('1', 'true', 'yes', 'on'),
+                 false_values=('0', 'false', 'no', 'off')):
+        self._cf = _read_conf_parser(conf_filename, encoding, case_sensitive)
+        self.env_prefix = env_prefix
+        self.list_sep = list_sep
+        self.true_values = frozenset(v.lower() for v in true_values)
+        self.false_values = frozenset(v.lower() for v in false_values)
+        # section 名称 -> FishConfigSection，第一次访问时创建
+        self._sections = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        section = self.section(name)
+        if section is None:
+            raise AttributeError('no section {}'.format(name))
+        return section
+
+    def __bool__(self):
+        # 配置文件是否读取成功
+        return self._cf is not None
+
+    __nonzero__ = __bool__
+
+    def __getitem__(self, name):
+        section = self._sections.get(name)
+        if section is None:
+            section = self.section(name)
+        if section is None:
+            raise KeyError(name)
+        return section
+
+    def __contains__(self, name):
+        return self._cf is not None and name in self._cf._sections
+
+    def __iter__(self):
+        return iter(self.sections())
+
+    def __len__(self):
+        return len(self.sections())
+
+    def _optionxform(self, key):
+        # 和 ConfigParser 保持一致，大小写不敏感时 key 统一为小写
+        return self._cf.optionxform(key) if self._cf is not None else key
+
+    def _env_name(self, section, key):
+        # 返回覆盖 section 中 key 的环境变量名，未设置 env_prefix 时返回 None
+        if self.env_prefix is None:
+            return None
+        return self.env_prefix + re.sub(r'\W', '_', '{}_{}'.format(section, key)).upper()
+
+    def _to_bool(self, value):
+        # 把字符串转换为 bool，不在 true_values、false_values 中时抛出 ValueError
+        lower = value.strip().lower()
+        if lower in self.true_values:
+            return True
+        if lower in self.false_values:
+            return False
+        raise ValueError('not a boolean: {}'.format(value))
+
+    def sections(self):
+        """
+        返回所有 section 名称
+
+        :return:
+            * sections: (list) section 名称列表，顺序与配置文件一致
+        """
+        return list(self._cf._sections) if self._cf is not None else []
+
+    def section(self, name):
+        """
+        返回 section 对象，第一次访问时合并 DEFAULT 的内容
+
+        :param:
+            * name: (string) section 名称
+        :return:
+            * section: (FishConfigSection) section 对象，不存在时返回 None
+        """
+        section = self._sections.get(name)
+        if section is not None:
+            return section
+        if name not in self:
+            return None
+        raw = OrderedDict(self._cf._defaults)
+        raw.update(self._cf._sections[name])
+        raw.pop('__name__', None)
+        section = self._sections.setdefault(name, FishConfigSection(self, name, raw))
+        return section
+
+    def _split(self, path):
+        # 'section.key' 从最后一个 . 分开，section 名称可以包含 .
+        name, _, key = path.rpartition('.')
+        return self.section(name), key
+
+    def _get(self, path, getter, default, sep=None):
+        # 类型转换的结果由 section 缓存
+        section, key = self._split(path)
+        if section is None:
+            return default
+        if getter == 'get_list':
+            return section.get_list(key, default, sep)
+        return getattr(section, getter)(key, default)
+
+    def get(self, path, default=None):
+        """
+        按 'section.key' 路径读取字符串值
+
+        :param:
+            * path: (string) 'section.key' 形式的路径
+            * default: 不存在时返回的值，默认为 None
+        :return:
+            * value: (string) 读取的值
+        """
+        return self._get(path, 'get', default)
+
+    def get_int(self, path, default=None):
+        """
+        按 'section.key' 路径读取值并转换为 int，参数同 get()
+        """
+        return self._get(path, 'get_int', default)
+
+    def get_float(self, path, default=None):
+        """
+        按 'section.key' 路径读取值并转换为 float，参数同 get()
+        """
+        return self._get(path, 'get_float', default)
+
+    def get_bool(self, path, default=None):
+        """
+        按 'section.key' 路径读取值并转换为 bool，参数同 get()
+        """
+        return self._get(path, 'get_bool', default)
+
+    def get_list(self, path, default=None, sep=None):
+        """
+        按 'section.key' 路径读取值并切分为 list，参数同 get()，sep 为分隔符，默认使用 list_sep
+        """
+        return self._get(path, 'get_list', default, sep)
+
+    def clear_cache(self):
+        """
+        清除已经创建的 section 和类型转换的缓存，环境变量变化后调用
+        """
+        self._sections = {}
+
+    def as_dict(self):
+        """
+        返回和 conf_as_dict() 相同结构的字典，包括环境变量覆盖后的值
+
+        :return:
+            * d: (OrderedDict) 配置文件内容
+        """
+        return OrderedDict((name, self.section(name).as_dict()) for name in self.sections())
+
+
 # 2019.01.06 edit by Hu Jun, #152
 class GetSha256(object):
     @staticmethod
@@ -11,6 +11,193 @@
 import hashlib
 import hmac
 import base64
+import binascii
+import os
+import stat
+import mmap
+import time
+import zlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# 读取文件计算 hash 时使用的缓冲区大小
+hash_buffer_size = 1024 * 1024
+
+# 流式 base64 编码时每次处理的字节数，是 3 的倍数
+base64_chunk_size = 3 * 256 * 1024
+
+# 不小于这个大小的普通文件使用 mmap 计算 hash
+mmap_threshold = 1024 * 1024
+
+# 每个线程复用一个读文件的缓冲区
+_thread_local = threading.local()
+
+
+def _get_buffer():
+    buf = getattr(_thread_local, 'buffer', None)
+    if buf is None or len(buf) != hash_buffer_size:
+        buf = _thread_local.buffer = bytearray(hash_buffer_size)
+    return buf
+
+
+def _update_from_stream(hash_obj, f):
+    # 用 readinto 读入复用的缓冲区，避免每块数据都新分配 bytes 对象
+    size = 0
+    if not hasattr(f, 'readinto'):
+        for chunk in iter(lambda: f.read(hash_buffer_size), b''):
+            hash_obj.update(chunk)
+            size += len(chunk)
+        return size
+
+    buf = _get_buffer()
+    view = memoryview(buf)
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            break
+        hash_obj.update(view[:n])
+        size += n
+    return size
+
+
+def _update_from_file(hash_obj, path, mode='auto'):
+    # path 可以是文件名，也可以是以二进制方式打开的文件对象，返回读取的字节数；
+    # file_digest 只有 FishHash.file() 支持，不经过这里
+    if mode not in ('auto', 'mmap', 'readinto'):
+        raise ValueError('mode should be one of auto, mmap, readinto, '
+                         'but we got {}'.format(mode))
+
+    if hasattr(path, 'read'):
+        if mode == 'mmap':
+            raise ValueError('mmap mode only support file name')
+        return _update_from_stream(hash_obj, path)
+
+    with open(path, 'rb', buffering=0) as f:
+        st = os.fstat(f.fileno())
+        if mode == 'auto':
+            mode = ('mmap' if stat.S_ISREG(st.st_mode) and st.st_size >= mmap_threshold
+                    else 'readinto')
+        if mode == 'readinto':
+            return _update_from_stream(hash_obj, f)
+        if st.st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            hash_obj.update(m)
+        return st.st_size
+
+
+def _to_bytes(data):
+    # 字符串按 utf-8 编码，bytes、bytearray、memoryview 直接使用
+    if isinstance(data, type(u'')):
+        return data.encode('utf-8')
+    return data
+
+
+# 作为文件名处理的类型，bytes 不是文件名，作为数据处理
+_path_types = (type(u''),) + ((os.PathLike,) if hasattr(os, 'PathLike') else ())
+
+
+def _iter_chunks(source, chunk_size):
+    # source 可以是文件名、bytes 数据、以二进制方式打开的文件对象或者产生 bytes 的可迭代对象
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source).cast('B')
+        for i in range(0, len(view), chunk_size):
+            yield bytes(view[i:i + chunk_size])
+    elif isinstance(source, _path_types):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield chunk
+    elif hasattr(source, 'read'):
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            yield chunk
+    else:
+        for chunk in source:
+            yield _to_bytes(chunk)
+
+
+def _write_chunks(chunks, dest):
+    # dest 可以是文件名或者以二进制方式打开的文件对象，返回写入的字节数
+    size = 0
+    if hasattr(dest, 'write'):
+        for chunk in chunks:
+            dest.write(chunk)
+            size += len(chunk)
+        return size
+    with open(dest, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            size += len(chunk)
+    return size
+
+
+class _Crc32(object):
+    # 与 hashlib 接口一致的 crc32，结果为 8 位 16 进制
+    name = 'crc32'
+    digest_size = 4
+
+    def __init__(self, data=b''):
+        self._crc = zlib.crc32(data) & 0xffffffff
+
+    def update(self, data):
+        self._crc = zlib.crc32(data, self._crc) & 0xffffffff
+
+    def copy(self):
+        obj = _Crc32()
+        obj._crc = self._crc
+        return obj
+
+    def digest(self):
+        return bytes(bytearray([(self._crc >> shift) & 0xff for shift in (24, 16, 8, 0)]))
+
+    def hexdigest(self):
+        return '%08x' % self._crc
+
+
+class _MultiHash(object):
+    # 把同一块数据依次交给多个 hash 对象；数据按 hash_buffer_size 分片，每片交给所有 hash 对象后再处理下一片，
+    # 对 mmap 的大文件每片只需要从磁盘读取一次，不会每种算法各读一遍整个文件
+    def __init__(self, hash_objs):
+        self.hash_objs = hash_objs
+
+    def update(self, data):
+        with memoryview(data) as view:
+            for start in range(0, len(view), hash_buffer_size):
+                with view[start:start + hash_buffer_size] as chunk:
+                    for hash_obj in self.hash_objs:
+                        hash_obj.update(chunk)
+
+
+def _new_hash(algo):
+    # 除了 hashlib 支持的算法，还支持 crc32
+    if algo == 'crc32':
+        return _Crc32()
+    return hashlib.new(algo)
+
+
+def _hash_block(args):
+    # 计算文件中一个固定大小块的 hash 值，定义在模块级别以便在多进程中使用
+    path, index, block_size, algo = args
+    hash_obj = _new_hash(algo)
+    buf = _get_buffer()
+    view = memoryview(buf)
+    remaining = block_size
+    with open(path, 'rb', buffering=0) as f:
+        f.seek(index * block_size)
+        while remaining > 0:
+            n = f.readinto(view[:min(len(buf), remaining)])
+            if not n:
+                break
+            hash_obj.update(view[:n])
+            remaining -= n
+    return hash_obj.hexdigest()
+
+
+def _hash_file(filename, algo):
+    hash_obj = _new_hash(algo)
+    size = _update_from_file(hash_obj, filename)
+    return hash_obj.hexdigest(), size
 
 
 # 2018.5.8 edit by David Yi, edit from Jia Chunying，#19026
@@ -18,6 +205,7 @@ import base64
 # 2018.10.28 edit by Hu Jun, #99
 # 2019.01.06 edit by Hu Jun, #152
 # 2019.01.21 v1.1.6 edit by Hu Jun, #200 move fish_common.FishMD5 to fish_crypt.FishMD5
+# v1.2.0 edit, file() 和 big_file() 改为使用 FishHash.file()
 class FishMD5(object):
     """
     计算普通字符串和一般的文件，对于大文件采取逐步读入的方式，也可以快速计算；基于 Python 的 hashlib.md5() 进行封装和扩展；
@@ -70,11 +258,7 @@ class FishMD5(object):
         :return:
             * result: (string) 32位小写 MD5 值
         """
-        m = hashlib.md5()
-        with open(filename, 'rb') as f:
-            m.update(f.read())
-            result = m.hexdigest()
-            return result
+        return FishHash.file(filename, 'md5')
     
     @staticmethod
     def big_file(filename):
@@ -86,14 +270,7 @@ class FishMD5(object):
         :return:
             * result: (string) 32位小写 MD5 值
         """
-        
-        md5 = hashlib.md5()
-        with open(filename, 'rb') as f:
-            for chunk in iter(lambda: f.read(8192), b''):
-                md5.update(chunk)
-        
-        result = md5.hexdigest()
-        return result
+        return FishHash.file(filename, 'md5')
     
     @staticmethod
     def hmac_md5(s, salt):
@@ -113,6 +290,7 @@ class FishMD5(object):
 
 # v1.0.14 edit by Hu Jun, #59
 # 2019.01.21 v1.1.6 edit by Hu Jun, #200 move fish_common.Base64 to fish_crypt.Base64
+# v1.2.0 edit, 增加流式编码和解码
 class FishBase64(object):
     """
     计算返回文件和字符串的 base64 编码字符串
@@ -173,6 +351,109 @@ class FishBase64(object):
         """
         return base64.b64decode(s)
 
+    # v1.2.0 create
+    @staticmethod
+    def iter_encode(source, chunk_size=base64_chunk_size, urlsafe=False, line_length=None):
+        """
+        流式 base64 编码，按 3 字节对齐分块编码，内存占用与数据大小无关
+
+        :param:
+            * source: (string, bytes, file or iterable) 文件名、bytes 数据、以二进制方式打开的文件对象或者产生 bytes 的可迭代对象
+            * chunk_size: (int) 每次编码的字节数，默认为 768K
+            * urlsafe: (bool) 是否使用 URL 安全的字符集，用 - 和 _ 代替 + 和 /，默认为 False
+            * line_length: (int) 每行的字符数，必须是 4 的倍数，比如 MIME 使用的 76，默认为 None 不换行
+        :return:
+            * (generator) 依次产生编码结果的 bytes
+        """
+        if line_length is not None and (line_length <= 0 or line_length % 4):
+            raise ValueError('line_length should be a positive multiple of 4, '
+                             'but we got {}'.format(line_length))
+        encode = base64.urlsafe_b64encode if urlsafe else base64.b64encode
+        unit = 3 if line_length is None else line_length // 4 * 3
+        block = max(unit, chunk_size // unit * unit)
+
+        def wrap(encoded):
+            if line_length is None:
+                return encoded
+            return b''.join(encoded[i:i + line_length] + b'\n'
+                            for i in range(0, len(encoded), line_length))
+
+        pending = bytearray()
+        for chunk in _iter_chunks(source, block):
+            pending += chunk
+            if len(pending) < block:
+                continue
+            end = len(pending) // block * block
+            yield wrap(encode(bytes(pending[:end])))
+            del pending[:end]
+        if pending:
+            yield wrap(encode(bytes(pending)))
+
+    # v1.2.0 create
+    @staticmethod
+    def iter_decode(source, chunk_size=base64_chunk_size, urlsafe=False):
+        """
+        流式 base64 解码，按 4 字符对齐分块解码，忽略换行和空白字符，内存占用与数据大小无关
+
+        :param:
+            * source: (string, bytes, file or iterable) 文件名、bytes 数据、以二进制方式打开的文件对象或者产生 bytes 的可迭代对象
+            * chunk_size: (int) 每次读取的字节数，默认为 768K
+            * urlsafe: (bool) 是否使用 URL 安全的字符集，默认为 False
+        :return:
+            * (generator) 依次产生解码结果的 bytes
+        """
+        decode = base64.urlsafe_b64decode if urlsafe else base64.b64decode
+        pending = bytearray()
+        for chunk in _iter_chunks(source, chunk_size):
+            pending += chunk.translate(None, b' \t\r\n')
+            end = len(pending) // 4 * 4
+            if end:
+                yield decode(bytes(pending[:end]))
+                del pending[:end]
+        if pending:
+            yield decode(bytes(pending))
+
+    # v1.2.0 create
+    @staticmethod
+    def encode_file(source, dest, chunk_size=base64_chunk_size, urlsafe=False, line_length=None):
+        """
+        流式 base64 编码文件，可以处理很大的文件
+
+        :param:
+            * source: (string, bytes, file or iterable) 需要编码的文件名、bytes 数据、文件对象或者产生 bytes 的可迭代对象
+            * dest: (string or file) 保存编码结果的文件名或者以二进制方式打开的文件对象
+            * chunk_size: (int) 每次编码的字节数，默认为 768K
+            * urlsafe: (bool) 是否使用 URL 安全的字符集，默认为 False
+            * line_length: (int) 每行的字符数，必须是 4 的倍数，默认为 None 不换行
+        :return:
+            * size: (int) 写入的字节数
+
+        举例如下::
+
+            print('--- FishBase64 encode_file demo ---')
+            print(FishBase64.encode_file('attachment.zip', 'attachment.b64', line_length=76))
+            print(FishBase64.decode_file('attachment.b64', 'attachment_copy.zip'))
+            print('---')
+
+        """
+        return _write_chunks(FishBase64.iter_encode(source, chunk_size, urlsafe, line_length), dest)
+
+    # v1.2.0 create
+    @staticmethod
+    def decode_file(source, dest, chunk_size=base64_chunk_size, urlsafe=False):
+        """
+        流式 base64 解码文件，可以处理很大的文件
+
+        :param:
+            * source: (string, bytes, file or iterable) 需要解码的文件名、bytes 数据、文件对象或者产生 bytes 的可迭代对象
+            * dest: (string or file) 保存解码结果的文件名或者以二进制方式打开的文件对象
+            * chunk_size: (int) 每次读取的字节数，默认为 768K
+            * urlsafe: (bool) 是否使用 URL 安全的字符集，默认为 False
+        :return:
+            * size: (int) 写入的字节数
+        """
+        return _write_chunks(FishBase64.iter_decode(source, chunk_size, urlsafe), dest)
+
 
 # v1.1.3 edit by Hu Jun, #100
 # 2019.01.06 v1.1.6 edit by Hu Jun, #152
@@ -230,3 +511,595 @@ class FishSha256(object):
         hashlib_sha256.update(message.encode('utf-8'))
         hashed_str = hashlib_sha256.hexdigest()
         return hashed_str
+
+
+# v1.2.0 create
+class FishHash(object):
+    """
+    计算文件的 hash 值，支持 hashlib 的所有算法；普通大文件使用 mmap，小文件和文件对象使用复用的缓冲区 readinto 读取，
+    不会把整个文件读入内存，也不会每块数据都分配新的 bytes 对象
+
+    举例如下::
+
+        print('--- FishHash demo ---')
+        file_path = get_abs_filename_with_sub_path('test_conf', 'test_conf.ini')[1])
+        print('file md5:', FishHash.file(file_path))
+        print('file sha256:', FishHash.file(file_path, 'sha256'))
+        with open(file_path, 'rb') as f:
+            print('stream sha1:', FishHash.file(f, 'sha1'))
+        print('---')
+
+    执行结果::
+
+        --- FishHash demo ---
+        file md5: fb7528c9778b2377e30b0f7e4c26fef0
+        file sha256: 2d21...
+        stream sha1: 6c5e...
+        ---
+
+    """
+    @staticmethod
+    def file(path, algo='md5', mode='auto'):
+        """
+        获取一个文件的 hash 值
+
+        :param:
+            * path: (string or file) 文件名，或者以二进制方式打开的文件对象
+            * algo: (string) hash 算法，hashlib 支持的算法名称或者 'crc32'，默认为 'md5'
+            * mode: (string) 读取方式，默认为 'auto'，不小于 mmap_threshold 的普通文件使用 mmap，
+              其余使用 readinto；也可以指定为 'mmap'、'readinto'，
+              或者 'file_digest' 使用 hashlib.file_digest()，需要 Python 3.11 以上
+        :return:
+            * result: (string) 16 进制小写 hash 值
+        """
+        if mode == 'file_digest':
+            if not hasattr(hashlib, 'file_digest'):
+                raise ValueError('hashlib.file_digest is not supported in this python version')
+            if hasattr(path, 'read'):
+                return hashlib.file_digest(path, algo).hexdigest()
+            with open(path, 'rb') as f:
+                return hashlib.file_digest(f, algo).hexdigest()
+
+        hash_obj = _new_hash(algo)
+        _update_from_file(hash_obj, path, mode)
+        return hash_obj.hexdigest()
+
+    @staticmethod
+    def multi_file(path, algos=('md5', 'sha256'), mode='auto'):
+        """
+        只读取一遍文件，同时计算多种 hash 值，比分别计算减少多次读取大文件的 I/O
+
+        :param:
+            * path: (string or file) 文件名，或者以二进制方式打开的文件对象
+            * algos: (list) hash 算法列表，hashlib 支持的算法名称或者 'crc32'，默认为 ('md5', 'sha256')
+            * mode: (string) 读取方式，默认为 'auto'，也可以指定为 'mmap'、'readinto'，不支持 'file_digest'
+        :return:
+            * result: (OrderedDict) 算法名称到 16 进制小写 hash 值的映射
+
+        举例如下::
+
+            print('--- FishHash multi_file demo ---')
+            file_path = get_abs_filename_with_sub_path('test_conf', 'test_conf.ini')[1])
+            print(FishHash.multi_file(file_path, ['md5', 'sha256', 'crc32']))
+            print('---')
+
+        执行结果::
+
+            --- FishHash multi_file demo ---
+            OrderedDict([('md5', 'fb7528c9778b2377e30b0f7e4c26fef0'), ('sha256', '2d21...'), ('crc32', '5a1b...')])
+            ---
+
+        """
+        hash_objs = OrderedDict((algo, _new_hash(algo)) for algo in algos)
+        _update_from_file(_MultiHash(list(hash_objs.values())), path, mode)
+        return OrderedDict((algo, hash_obj.hexdigest()) for algo, hash_obj in hash_objs.items())
+
+
+# v1.2.0 create
+class FishHasher(object):
+    """
+    流式计算 hash 或 hmac 值，可以分多次传入数据，不需要把完整的消息放在内存中；
+    数据可以是 bytes、bytearray、memoryview 或字符串（按 utf-8 编码），也可以是生成器、文件或 socket 文件对象；
+    通过 copy() 可以复制当前状态，用于多个消息共享相同前缀或者同一个 hmac 密钥的场景
+
+    :param:
+        * algo: (string) hash 算法，hashlib 支持的算法名称，默认为 'md5'
+        * data: (bytes or string) 初始数据，默认为 None
+
+    举例如下::
+
+        print('--- FishHasher demo ---')
+        hasher = FishHasher('md5')
+        hasher.update('hello ').update(b'world!')
+        print('md5:', hasher.hexdigest())
+
+        # hmac 密钥只设置一次，每个消息复制一份状态后计算
+        signer = FishHasher.hmac('12345678', 'sha256')
+        print('hmac_sha256:', signer.copy().update('Hello HMAC').hexdigest())
+
+        # 从生成器中读取数据
+        print('sha1:', FishHasher('sha1').update_from(s for s in ['a', 'b', 'c']).hexdigest())
+        print('---')
+
+    执行结果::
+
+        --- FishHasher demo ---
+        md5: fc3ff98e8c6a0d3087d515c0473f8677
+        hmac_sha256: 5eb8bdabdaa43f61fb220473028e49d40728444b4322f3093decd9a356afd18f
+        sha1: a9993e364706816aba3e25717850c26c9cd0d89d
+        ---
+
+    """
+
+    def __init__(self, algo='md5', data=None):
+        self._hash_obj = hashlib.new(algo)
+        if data is not None:
+            self.update(data)
+
+    @classmethod
+    def hmac(cls, key, algo='sha256', data=None):
+        """
+        创建计算 hmac 值的 FishHasher
+
+        :param:
+            * key: (bytes or string) hmac 密钥
+            * algo: (string) hash 算法，hashlib 支持的算法名称，默认为 'sha256'
+            * data: (bytes or string) 初始数据，默认为 None
+        :return:
+            * hasher: (FishHasher) 计算 hmac 值的 FishHasher
+        """
+        hasher = cls.__new__(cls)
+        hasher._hash_obj = hmac.new(_to_bytes(key), digestmod=algo)
+        if data is not None:
+            hasher.update(data)
+        return hasher
+
+    @property
+    def name(self):
+        return self._hash_obj.name
+
+    @property
+    def digest_size(self):
+        return self._hash_obj.digest_size
+
+    def update(self, data):
+        """
+        传入一段数据
+
+        :param:
+            * data: (bytes, bytearray, memoryview or string) 数据，字符串按 utf-8 编码
+        :return:
+            * self: (FishHasher) 自身，可以链式调用
+        """
+        self._hash_obj.update(_to_bytes(data))
+        return self
+
+    def update_from(self, source):
+        """
+        从文件对象或者可迭代对象中读取全部数据
+
+        :param:
+            * source: (file or iterable) 有 read 方法的文件对象，比如 socket.makefile('rb')，
+              或者产生数据块的生成器、列表等
+        :return:
+            * self: (FishHasher) 自身，可以链式调用
+        """
+        if hasattr(source, 'read'):
+            _update_from_stream(self._hash_obj, source)
+        else:
+            for chunk in source:
+                self._hash_obj.update(_to_bytes(chunk))
+        return self
+
+    def copy(self):
+        """
+        复制当前状态，返回新的 FishHasher，之后两者的计算互不影响
+        """
+        hasher = self.__class__.__new__(self.__class__)
+        hasher._hash_obj = self._hash_obj.copy()
+        return hasher
+
+    def digest(self):
+        return self._hash_obj.digest()
+
+    def hexdigest(self):
+        return self._hash_obj.hexdigest()
+
+
+# v1.2.0 create
+class FishSigner(object):
+    """
+    使用固定密钥高频计算 hmac 签名；创建时只初始化一次密钥对应的 hmac 对象，
+    每次签名只需要 copy() 这个对象，不需要重新编码密钥和计算密钥相关的部分，适合网关对每个请求签名的场景
+
+    :param:
+        * secret: (bytes or string) hmac 密钥，字符串按 utf-8 编码
+        * algo: (string) hash 算法，hashlib 支持的算法名称，默认为 'sha256'
+
+    举例如下::
+
+        print('--- FishSigner demo ---')
+        signer = FishSigner('12345678')
+        print('sign:', signer.sign('Hello HMAC'))
+        print('sign_many:', signer.sign_many(['Hello HMAC', 'Hello world']))
+        print('---')
+
+    执行结果::
+
+        --- FishSigner demo ---
+        sign: 5eb8bdabdaa43f61fb220473028e49d40728444b4322f3093decd9a356afd18f
+        sign_many: ['5eb8bdabdaa43f61fb220473028e49d40728444b4322f3093decd9a356afd18f', '...']
+        ---
+
+    """
+
+    def __init__(self, secret, algo='sha256'):
+        self._hmac = hmac.new(_to_bytes(secret), digestmod=algo)
+
+    def _sign(self, message):
+        signer = self._hmac.copy()
+        signer.update(_to_bytes(message))
+        return signer
+
+    def sign_digest(self, message):
+        """
+        获取消息的 hmac 签名，返回 bytes
+
+        :param:
+            * message: (bytes or string) 需要签名的消息，字符串按 utf-8 编码
+        :return:
+            * result: (bytes) hmac 签名
+        """
+        return self._sign(message).digest()
+
+    def sign(self, message):
+        """
+        获取消息的 hmac 签名，结果与 FishSha256.hmac_sha256(secret, message) 相同
+
+        :param:
+            * message: (bytes or string) 需要签名的消息，字符串按 utf-8 编码
+        :return:
+            * result: (string) 16 进制小写 hmac 签名
+        """
+        return self._sign(message).hexdigest()
+
+    def sign_many(self, messages):
+        """
+        批量获取多个消息的 hmac 签名
+
+        :param:
+            * messages: (iterable) 需要签名的消息
+        :return:
+            * result: (list) 16 进制小写 hmac 签名列表，顺序与 messages 一致
+        """
+        sign = self._sign
+        return [sign(message).hexdigest() for message in messages]
+
+
+# v1.2.0 create
+def hash_files(paths, algo='md5', workers=4):
+    """
+    使用线程池并发计算多个文件的 hash 值，适合对大量文件计算指纹；hashlib 在计算大块数据时会释放 GIL，
+    每个线程复用一个 1M 的缓冲区通过 readinto 读取文件
+
+    :param:
+        * paths: (list) 需要计算 hash 的文件路径列表
+        * algo: (string) hash 算法，hashlib 支持的算法名称或者 'crc32'，比如 'md5'、'sha256'，默认为 'md5'
+        * workers: (int) 线程数，默认为 4
+    :return:
+        * digests: (OrderedDict) 文件路径到 16 进制小写 hash 值的映射，顺序与 paths 一致
+        * stats: (dict) 统计信息，包括 files 文件数、bytes 总字节数、seconds 耗时秒数、mb_per_sec 每秒处理的 MB 数
+
+    举例如下::
+
+        print('--- hash_files demo ---')
+        digests, stats = hash_files(['test_conf.ini', 'test_conf.yaml'], algo='sha256', workers=2)
+        for path, digest in digests.items():
+            print(path, digest)
+        print(stats)
+        print('---')
+
+    执行结果::
+
+        --- hash_files demo ---
+        test_conf.ini 7a4c...
+        test_conf.yaml 1f0e...
+        {'files': 2, 'bytes': 1325, 'seconds': 0.0012, 'mb_per_sec': 1.05}
+        ---
+
+    """
+    paths = list(paths)
+    # 提前检查算法名称
+    _new_hash(algo)
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(lambda path: _hash_file(path, algo), paths))
+    seconds = time.time() - start
+
+    digests = OrderedDict()
+    total_bytes = 0
+    for path, (digest, size) in zip(paths, results):
+        digests[path] = digest
+        total_bytes += size
+
+    stats = {'files': len(paths), 'bytes': total_bytes, 'seconds': seconds,
+             'mb_per_sec': total_bytes / 1024.0 / 1024.0 / seconds if seconds > 0 else 0.0}
+    return digests, stats
+
+
+# v1.2.0 create
+class FileDigestCache(object):
+    """
+    持久化的文件 hash 值缓存，保存在 sqlite 数据库中；以 (设备号, inode, 文件大小, 修改时间, 算法) 判断文件是否变化，
+    未变化的文件直接返回缓存的 hash 值，只对新文件和修改过的文件重新计算；
+    数据库使用 WAL 模式，多个进程可以同时使用同一个缓存文件
+
+    :param:
+        * db_filename: (string) 缓存数据库文件名
+        * timeout: (float) 数据库被其他进程锁定时的等待秒数，默认为 30
+
+    举例如下::
+
+        print('--- FileDigestCache demo ---')
+        cache = FileDigestCache('digest_cache.db')
+        print(cache.digest('test_conf.ini'))
+        print(cache.digest_files(['test_conf.ini', 'test_conf.yaml'], algo='sha256', workers=2))
+        print(cache.stats())
+        cache.close()
+        print('---')
+
+    执行结果::
+
+        --- FileDigestCache demo ---
+        79e1a2614f1afc8297856b7ffdaf4c47
+        OrderedDict([('test_conf.ini', '7a4c...'), ('test_conf.yaml', '1f0e...')])
+        {'hits': 0, 'misses': 3, 'hit_rate': 0.0}
+        ---
+
+    """
+
+    def __init__(self, db_filename, timeout=30):
+        self.db_filename = db_filename
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+
+        conn = self._get_conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS file_digest ('
+                     'dev INTEGER, ino INTEGER, algo TEXT, size INTEGER, mtime_ns INTEGER, '
+                     'digest TEXT, PRIMARY KEY (dev, ino, algo))')
+        conn.commit()
+
+    def _get_conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_filename, timeout=self.timeout,
+                                   check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _stat_key(path):
+        st = os.stat(path)
+        mtime_ns = getattr(st, 'st_mtime_ns', int(st.st_mtime * 1000000000))
+        return st.st_dev, st.st_ino, st.st_size, mtime_ns
+
+    def _lookup(self, stat_key, algo):
+        dev, ino, size, mtime_ns = stat_key
+        row = self._get_conn().execute(
+            'SELECT digest FROM file_digest WHERE dev=? AND ino=? AND algo=? '
+            'AND size=? AND mtime_ns=?', (dev, ino, algo, size, mtime_ns)).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return row[0] if row is not None else None
+
+    def _store(self, path, stat_key, algo, digest):
+        # 计算过程中文件被修改时不缓存
+        if self._stat_key(path) != stat_key:
+            return
+        dev, ino, size, mtime_ns = stat_key
+        conn = self._get_conn()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO file_digest VALUES (?, ?, ?, ?, ?, ?)',
+                         (dev, ino, algo, size, mtime_ns, digest))
+
+    def digest(self, path, algo='md5'):
+        """
+        获取一个文件的 hash 值，文件未变化时直接返回缓存的结果
+
+        :param:
+            * path: (string) 文件名
+            * algo: (string) hash 算法，hashlib 支持的算法名称，默认为 'md5'
+        :return:
+            * result: (string) 16 进制小写 hash 值
+        """
+        stat_key = self._stat_key(path)
+        digest = self._lookup(stat_key, algo)
+        if digest is None:
+            digest = FishHash.file(path, algo)
+            self._store(path, stat_key, algo, digest)
+        return digest
+
+    def digest_files(self, paths, algo='md5', workers=4):
+        """
+        获取多个文件的 hash 值，未命中缓存的文件使用 hash_files() 并发计算
+
+        :param:
+            * paths: (list) 文件名列表
+            * algo: (string) hash 算法，hashlib 支持的算法名称，默认为 'md5'
+            * workers: (int) 计算 hash 的线程数，默认为 4
+        :return:
+            * digests: (OrderedDict) 文件路径到 16 进制小写 hash 值的映射，顺序与 paths 一致
+        """
+        paths = list(paths)
+        digests = OrderedDict((path, None) for path in paths)
+        stat_keys = {}
+        for path in digests:
+            stat_keys[path] = self._stat_key(path)
+            digests[path] = self._lookup(stat_keys[path], algo)
+
+        missed = [path for path, digest in digests.items() if digest is None]
+        if missed:
+            for path, digest in hash_files(missed, algo, workers)[0].items():
+                digests[path] = digest
+                self._store(path, stat_keys[path], algo, digest)
+        return digests
+
+    def stats(self):
+        """
+        获取缓存命中统计
+
+        :return:
+            * stats: (dict) hits 命中次数，misses 未命中次数，hit_rate 命中率
+        """
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': float(self.hits) / total if total else 0.0}
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+# v1.2.0 create
+class FishMerkle(object):
+    """
+    把大文件按固定大小分块，分别计算每块的 hash 值，再计算这些 hash 值的 Merkle 根；
+    校验时可以只重新计算指定的块，快速定位损坏的位置，多个块可以在多个线程或进程中并行计算
+
+    Merkle 树的叶子节点为 hash(b'\\x00' + 块的 hash 值)，内部节点为 hash(b'\\x01' + 左子节点 + 右子节点)，
+    叶子和内部节点使用不同的前缀，避免把内部节点伪造成叶子；某一层节点数为奇数时最后一个节点直接进入上一层
+
+    :param:
+        * block_size: (int) 块大小，默认为 4M
+        * algo: (string) hash 算法，hashlib 支持的算法名称，默认为 'sha256'
+
+    举例如下::
+
+        print('--- FishMerkle demo ---')
+        merkle = FishMerkle(block_size=4 * 1024 * 1024)
+        digests, root = merkle.build('backup.tar', workers=4)
+        print('blocks:', len(digests), 'root:', root)
+        # 之后校验，返回内容不一致的块序号
+        print('bad blocks:', merkle.verify('backup.tar', digests, workers=4))
+        # 只校验指定的块
+        print('bad blocks:', merkle.verify('backup.tar', digests, blocks=[0, 10]))
+        print('---')
+
+    执行结果::
+
+        --- FishMerkle demo ---
+        blocks: 128 root: 8c1f...
+        bad blocks: []
+        bad blocks: []
+        ---
+
+    """
+
+    def __init__(self, block_size=4 * 1024 * 1024, algo='sha256'):
+        if block_size <= 0:
+            raise ValueError('block_size should be positive, but we got {}'.format(block_size))
+        hashlib.new(algo)
+        self.block_size = block_size
+        self.algo = algo
+
+    def block_count(self, path):
+        size = os.path.getsize(path)
+        return (size + self.block_size - 1) // self.block_size
+
+    def hash_blocks(self, path, blocks=None, workers=1, use_process=False):
+        """
+        计算文件中指定块的 hash 值
+
+        :param:
+            * path: (string) 文件名
+            * blocks: (list) 需要计算的块序号，默认为 None 计算所有块
+            * workers: (int) 并行计算的线程数或进程数，默认为 1
+            * use_process: (bool) 是否使用多进程，默认为 False 使用多线程
+        :return:
+            * digests: (OrderedDict) 块序号到 16 进制小写 hash 值的映射
+        """
+        if blocks is None:
+            blocks = range(self.block_count(path))
+        tasks = [(path, index, self.block_size, self.algo) for index in blocks]
+
+        if workers <= 1:
+            results = [_hash_block(task) for task in tasks]
+        else:
+            executor_class = ProcessPoolExecutor if use_process else ThreadPoolExecutor
+            with executor_class(max_workers=workers) as executor:
+                results = list(executor.map(_hash_block, tasks))
+        return OrderedDict((task[1], digest) for task, digest in zip(tasks, results))
+
+    def root(self, digests):
+        """
+        根据各块的 hash 值计算 Merkle 根
+
+        :param:
+            * digests: (list) 按块顺序排列的 16 进制 hash 值
+        :return:
+            * root: (string) 16 进制小写 Merkle 根，没有任何块时为空数据的 hash 值
+        """
+        if not digests:
+            return hashlib.new(self.algo).hexdigest()
+        nodes = [hashlib.new(self.algo, b'\x00' + binascii.unhexlify(digest)).digest()
+                 for digest in digests]
+        while len(nodes) > 1:
+            parents = [hashlib.new(self.algo, b'\x01' + nodes[i] + nodes[i + 1]).digest()
+                       for i in range(0, len(nodes) - 1, 2)]
+            if len(nodes) % 2:
+                parents.append(nodes[-1])
+            nodes = parents
+        return binascii.hexlify(nodes[0]).decode('ascii')
+
+    def build(self, path, workers=1, use_process=False):
+        """
+        计算文件所有块的 hash 值和 Merkle 根
+
+        :param:
+            * path: (string) 文件名
+            * workers: (int) 并行计算的线程数或进程数，默认为 1
+            * use_process: (bool) 是否使用多进程，默认为 False 使用多线程
+        :return:
+            * digests: (list) 按块顺序排列的 16 进制小写 hash 值
+            * root: (string) 16 进制小写 Merkle 根
+        """
+        digests = list(self.hash_blocks(path, workers=workers, use_process=use_process).values())
+        return digests, self.root(digests)
+
+    def verify(self, path, digests, blocks=None, workers=1, use_process=False):
+        """
+        校验文件，返回内容与 digests 不一致的块序号；文件变长或变短时，多出或缺少的块也视为不一致
+
+        :param:
+            * path: (string) 文件名
+            * digests: (list) build() 返回的各块 hash 值
+            * blocks: (list) 需要校验的块序号，默认为 None 校验所有块
+            * workers: (int) 并行计算的线程数或进程数，默认为 1
+            * use_process: (bool) 是否使用多进程，默认为 False 使用多线程
+        :return:
+            * bad_blocks: (list) 不一致的块序号，按从小到大排列
+        """
+        count = self.block_count(path)
+        if blocks is None:
+            blocks = range(max(count, len(digests)))
+        blocks = sorted(set(blocks))
+
+        bad_blocks = [index for index in blocks if index >= count or index >= len(digests)]
+        check_blocks = [index for index in blocks if index < count and index < len(digests)]
+        current = self.hash_blocks(path, check_blocks, workers=workers, use_process=use_process)
+        bad_blocks.extend(index for index, digest in current.items() if digest != digests[index])
+        return sorted(bad_blocks)
@@ -1,7 +1,82 @@
 # coding=utf-8
+import io
+import os
 import csv
+import contextlib
+import gzip
+import bz2
+import time
+import sqlite3
+import itertools
 from io import open
 
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+# 读写 csv 文件时使用的缓冲区大小
+CSV_BUFFER_SIZE = 1024 * 1024
+
+# 扩展名与压缩格式的对应关系
+_compression_ext = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.lzma': 'xz'}
+
+# 文件头 magic bytes 与压缩格式的对应关系
+_compression_magic = ((b'\x1f\x8b', 'gzip'), (b'BZh', 'bz2'), (b'\xfd7zXZ\x00', 'xz'))
+
+
+# v1.2.0 edit, 根据扩展名或文件头判断压缩格式
+def _infer_compression(csv_filename, mode):
+    ext = os.path.splitext(csv_filename)[1].lower()
+    if ext in _compression_ext:
+        return _compression_ext[ext]
+    # 读取时扩展名无法判断，再检查文件头
+    if mode == 'r' and os.path.isfile(csv_filename):
+        with open(csv_filename, 'rb') as f:
+            head = f.read(6)
+        for magic, compression in _compression_magic:
+            if head.startswith(magic):
+                return compression
+    return None
+
+
+def _open_codec(raw, mode, compression, compresslevel):
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode=mode + 'b',
+                             compresslevel=9 if compresslevel is None else compresslevel)
+    if compression == 'bz2':
+        return bz2.BZ2File(raw, mode=mode,
+                           compresslevel=9 if compresslevel is None else compresslevel)
+    if compression == 'xz':
+        if lzma is None:
+            raise ValueError('xz compression is not supported, lzma module not found')
+        if mode == 'r':
+            return lzma.LZMAFile(raw, mode=mode)
+        return lzma.LZMAFile(raw, mode=mode, preset=compresslevel)
+    raise ValueError('compression should be one of infer, gzip, bz2, xz or None, '
+                     'but we got {}'.format(compression))
+
+
+# v1.2.0 edit, 支持透明读写 gzip、bz2、xz 压缩的 csv 文件
+@contextlib.contextmanager
+def _open_csv(csv_filename, mode='r', encoding=None, compression='infer', compresslevel=None):
+    if compression == 'infer':
+        compression = _infer_compression(csv_filename, mode)
+
+    if compression is None:
+        with open(csv_filename, mode, encoding=encoding, buffering=CSV_BUFFER_SIZE) as f:
+            yield f
+        return
+
+    with open(csv_filename, mode + 'b', buffering=CSV_BUFFER_SIZE) as raw:
+        with _open_codec(raw, mode, compression, compresslevel) as stream:
+            if mode == 'r':
+                buffered = io.BufferedReader(stream, CSV_BUFFER_SIZE)
+            else:
+                buffered = io.BufferedWriter(stream, CSV_BUFFER_SIZE)
+            with io.TextIOWrapper(buffered, encoding=encoding) as f:
+                yield f
+
 
 # 将指定的 csv 文件转换为 list 返回
 # 输入：
@@ -14,16 +89,19 @@ from io import open
 # 2018.2.6 edit by David Yi, #11009， 增加过滤空行功能
 # v1.0.16 edit by Hu Jun #94
 # v1.1.4 edit by Hu Jun #126
-def csv2list(csv_filename, deli=',', del_blank_row=True, encoding=None):
+# v1.2.0 edit, 增加 compression 参数
+def csv2list(csv_filename, deli=',', del_blank_row=True, encoding=None, compression='infer'):
 
     """
-    将指定的 csv 文件转换为 list 返回；
+    将指定的 csv 文件转换为 list 返回；支持 gzip、bz2、xz 压缩的 csv 文件；
 
     :param:
         * csv_filename: (string) csv 文件的长文件名
         * deli: (string) csv 文件分隔符，默认为逗号
         * del_blank_row: (string) 是否要删除空行，默认为删除
         * encode: (string) 文件编码
+        * compression: (string) 压缩格式，可选 'gzip'、'bz2'、'xz' 或 None，
+          默认为 'infer'，根据扩展名或文件头自动判断
     :return:
         * csv_list: (list) 转换后的 list
 
@@ -43,7 +121,7 @@ def csv2list(csv_filename, deli=',', del_blank_row=True, encoding=None):
             test_csv()
 
     """
-    with open(csv_filename, encoding=encoding) as csv_file:
+    with _open_csv(csv_filename, encoding=encoding, compression=compression) as csv_file:
         csv_list = list(csv.reader(csv_file, delimiter=deli))
 
     # 如果设置为要删除空行
@@ -58,14 +136,20 @@ csv_file_to_list = csv2list
 
 
 # v1.1.4 edit by Hu Jun #126
-def list2csv(data_list, csv_filename='./list2csv.csv'):
+# v1.2.0 edit, 增加 compression、compresslevel 和 encoding 参数
+def list2csv(data_list, csv_filename='./list2csv.csv', compression='infer', compresslevel=None,
+             encoding=None):
 
     """
-    将字典写入到指定的 csv 文件，并返回文件的长文件名；
+    将字典写入到指定的 csv 文件，并返回文件的长文件名；支持写入 gzip、bz2、xz 压缩的 csv 文件；
 
     :param:
         * data_list: (list) 需要写入 csv 的数据字典
         * csv_filename: (string) csv 文件的长文件名
+        * compression: (string) 压缩格式，可选 'gzip'、'bz2'、'xz' 或 None，
+          默认为 'infer'，根据扩展名自动判断
+        * compresslevel: (int) 压缩级别，默认为 None，使用各压缩格式的默认级别
+        * encoding: (string) 文件编码，默认为 None，使用系统默认编码
     :return:
         * csv_filename: (string) csv 文件的长文件名
 
@@ -83,7 +167,8 @@ def list2csv(data_list, csv_filename='./list2csv.csv'):
             test_list2csv()
 
     """
-    with open(csv_filename, "w") as csv_file:
+    with _open_csv(csv_filename, "w", encoding=encoding, compression=compression,
+                   compresslevel=compresslevel) as csv_file:
         csv_writer = csv.writer(csv_file)
         for data in data_list:
             csv_writer.writerow(data)
@@ -91,16 +176,19 @@ def list2csv(data_list, csv_filename='./list2csv.csv'):
 
 
 # v1.1.4 edit by Hu Jun #126
-def csv2dict(csv_filename, deli=',', encoding=None, key_is_header=False):
+# v1.2.0 edit, 增加 compression 参数
+def csv2dict(csv_filename, deli=',', encoding=None, key_is_header=False, compression='infer'):
 
     """
-    将指定的 csv 文件转换为 list 返回；
+    将指定的 csv 文件转换为 list 返回；支持 gzip、bz2、xz 压缩的 csv 文件；
 
     :param:
         * csv_filename: (string) csv 文件的长文件名
         * deli: (string) csv 文件分隔符，默认为逗号
         * del_blank_row: (string) 是否要删除空行，默认为删除
         * encode: (string) 文件编码
+        * compression: (string) 压缩格式，可选 'gzip'、'bz2'、'xz' 或 None，
+          默认为 'infer'，根据扩展名或文件头自动判断
     :return:
         * csv_data: (dict) 读取后的数据
 
@@ -120,7 +208,7 @@ def csv2dict(csv_filename, deli=',', encoding=None, key_is_header=False):
             test_csv2dict()
 
     """
-    with open(csv_filename, encoding=encoding) as csv_file:
+    with _open_csv(csv_filename, encoding=encoding, compression=compression) as csv_file:
         if key_is_header:
             reader = csv.reader(csv_file, delimiter=deli)
             # 读取字典 key
@@ -132,15 +220,21 @@ def csv2dict(csv_filename, deli=',', encoding=None, key_is_header=False):
 
 
 # v1.1.4 edit by Hu Jun #126
-def dict2csv(data_dict, csv_filename='./dict2csv.csv', key_is_header=False):
+# v1.2.0 edit, 增加 compression、compresslevel 和 encoding 参数
+def dict2csv(data_dict, csv_filename='./dict2csv.csv', key_is_header=False,
+             compression='infer', compresslevel=None, encoding=None):
 
     """
-    将字典写入到指定的 csv 文件，并返回文件的长文件名；
+    将字典写入到指定的 csv 文件，并返回文件的长文件名；支持写入 gzip、bz2、xz 压缩的 csv 文件；
 
     :param:
         * data_dict: (dict) 需要写入 csv 的数据字典
         * csv_filename: (string) csv 文件的长文件名
         * key_is_header: (bool) csv 文件第一行是否全为字典 key
+        * compression: (string) 压缩格式，可选 'gzip'、'bz2'、'xz' 或 None，
+          默认为 'infer'，根据扩展名自动判断
+        * compresslevel: (int) 压缩级别，默认为 None，使用各压缩格式的默认级别
+        * encoding: (string) 文件编码，默认为 None，使用系统默认编码
     :return:
         * csv_filename: (string) csv 文件的长文件名
 
@@ -158,7 +252,8 @@ def dict2csv(data_dict, csv_filename='./dict2csv.csv', key_is_header=False):
             test_dict2csv()
 
     """
-    with open(csv_filename, "w") as csv_file:
+    with _open_csv(csv_filename, "w", encoding=encoding, compression=compression,
+                   compresslevel=compresslevel) as csv_file:
         csv_writer = csv.writer(csv_file)
         if key_is_header:
             if isinstance(data_dict, dict):
@@ -175,3 +270,153 @@ def dict2csv(data_dict, csv_filename='./dict2csv.csv', key_is_header=False):
         else:
             csv_writer.writerows(data_dict.items())
     return csv_filename
+
+
+# csv2sqlite 默认使用的 PRAGMA，以牺牲导入过程中的崩溃安全性换取导入速度
+csv2sqlite_pragmas = {'journal_mode': 'MEMORY', 'synchronous': 'OFF', 'cache_size': -65536}
+
+
+def _quote_identifier(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _infer_column_type(values):
+    col_type = 'INTEGER'
+    for value in values:
+        if value == '':
+            continue
+        if col_type == 'INTEGER':
+            try:
+                int(value)
+                continue
+            except ValueError:
+                col_type = 'REAL'
+        try:
+            float(value)
+        except ValueError:
+            return 'TEXT'
+    return col_type
+
+
+# v1.2.0 create
+def csv2sqlite(csv_filename, db, table, deli=',', encoding=None, compression='infer',
+               has_header=True, batch_size=10000, sample_size=1000, indexes=None, pragmas=None):
+
+    """
+    将指定的 csv 文件批量导入到 sqlite 数据库的表中，返回导入的行数和速度；
+
+    csv 文件按批读取，在一个事务中通过 executemany 写入，不会一次性读入内存；
+    字段类型根据前 sample_size 行数据推断为 INTEGER、REAL 或 TEXT；索引在数据导入完成后再创建；
+
+    :param:
+        * csv_filename: (string) csv 文件的长文件名，支持 gzip、bz2、xz 压缩的 csv 文件
+        * db: (string or sqlite3.Connection) sqlite 数据库文件名或者已打开的数据库连接
+        * table: (string) 表名，不存在时自动创建
+        * deli: (string) csv 文件分隔符，默认为逗号
+        * encoding: (string) 文件编码
+        * compression: (string) 压缩格式，默认为 'infer'，根据扩展名或文件头自动判断
+        * has_header: (bool) csv 文件第一行是否为字段名，默认为 True；为 False 时字段名为 col_1, col_2 ...
+        * batch_size: (int) 每批写入的行数，默认为 10000
+        * sample_size: (int) 用于推断字段类型的行数，默认为 1000
+        * indexes: (list) 导入完成后需要创建索引的字段名，元素为字段名或者字段名组成的 tuple
+        * pragmas: (dict) 导入时使用的 PRAGMA，会覆盖 csv2sqlite_pragmas 中的同名设置；
+          db 为数据库文件名时使用 csv2sqlite_pragmas，已经是 WAL 模式的数据库不修改 journal_mode；
+          db 为已打开的连接时只使用 pragmas 中的设置；导入完成后恢复原来的设置
+
+    db 为已打开的连接时，导入会提交自己的事务，失败时回滚，因此连接上不能有未提交的事务，否则抛出 ValueError
+    :return:
+        * result: (dict) 导入结果，包括 rows 导入行数，seconds 耗时秒数，rows_per_sec 每秒导入行数
+
+    举例如下::
+
+        from fishbase.fish_csv import *
+
+        def test_csv2sqlite():
+            result = csv2sqlite('./test_csv.csv', './test.db', 'test_table', indexes=['id'])
+            print(result)
+
+
+        if __name__ == '__main__':
+            test_csv2sqlite()
+
+    执行结果::
+
+        {'rows': 3, 'seconds': 0.0021, 'rows_per_sec': 1428.57}
+
+    """
+    start = time.time()
+
+    own_conn = not isinstance(db, sqlite3.Connection)
+    # 导入过程中会提交和回滚事务，不能混入调用方未提交的事务
+    if not own_conn and db.in_transaction:
+        raise ValueError('db connection has an open transaction, commit or rollback it first')
+    conn = sqlite3.connect(db) if own_conn else db
+
+    # 调用方传入的连接只使用 pragmas 中指定的设置
+    pragma_dict = dict(csv2sqlite_pragmas) if own_conn else {}
+    # 已经是 WAL 模式的数据库不修改默认的 journal_mode
+    if own_conn and conn.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal':
+        pragma_dict.pop('journal_mode', None)
+    if pragmas is not None:
+        pragma_dict.update(pragmas)
+
+    # 导入前的设置，导入完成后恢复
+    saved_pragmas = []
+    count = 0
+    try:
+        for key, value in pragma_dict.items():
+            saved_pragmas.append((key, conn.execute('PRAGMA {}'.format(key)).fetchone()[0]))
+            conn.execute('PRAGMA {}={}'.format(key, value))
+
+        with _open_csv(csv_filename, encoding=encoding, compression=compression) as csv_file:
+            reader = (row for row in csv.reader(csv_file, delimiter=deli) if row)
+
+            header = next(reader, None) if has_header else None
+            sample = list(itertools.islice(reader, sample_size))
+
+            if header is None:
+                if not sample:
+                    raise ValueError('csv file {} is empty'.format(csv_filename))
+                header = ['col_{}'.format(i + 1) for i in range(len(sample[0]))]
+
+            col_types = [_infer_column_type([row[i] for row in sample if i < len(row)])
+                         for i in range(len(header))]
+            columns = ', '.join('{} {}'.format(_quote_identifier(name), col_type)
+                                for name, col_type in zip(header, col_types))
+
+            conn.execute('CREATE TABLE IF NOT EXISTS {} ({})'.format(_quote_identifier(table),
+                                                                     columns))
+            insert_sql = 'INSERT INTO {} VALUES ({})'.format(_quote_identifier(table),
+                                                             ', '.join(['?'] * len(header)))
+
+            rows = itertools.chain(sample, reader)
+            with conn:
+                while True:
+                    batch = list(itertools.islice(rows, batch_size))
+                    if not batch:
+                        break
+                    conn.executemany(insert_sql, batch)
+                    count += len(batch)
+
+        for index in indexes or []:
+            index_cols = (index,) if not isinstance(index, (tuple, list)) else index
+            index_name = 'idx_{}_{}'.format(table, '_'.join(index_cols))
+            conn.execute('CREATE INDEX IF NOT EXISTS {} ON {} ({})'.format(
+                _quote_identifier(index_name), _quote_identifier(table),
+                ', '.join(_quote_identifier(col) for col in index_cols)))
+        conn.commit()
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        for key, value in reversed(saved_pragmas):
+            try:
+                conn.execute('PRAGMA {}={}'.format(key, value))
+            except sqlite3.Error:
+                # 恢复失败时不掩盖导入过程中的异常
+                pass
+        if own_conn:
+            conn.close()
+
+    seconds = time.time() - start
+    return {'rows': count, 'seconds': seconds,
+            'rows_per_sec': count / seconds if seconds > 0 else float(count)}
@@ -13,22 +13,73 @@
 # 2017.8.14 move to fish_base
 
 import sys
+import atexit
+import copy
+import locale
 import logging
+import threading
 from logging import FileHandler
+from logging.handlers import QueueHandler, QueueListener
 import codecs
+import json
 import time
 import os
+import re
+import gzip
+import shutil
+import random
+import bisect
+from collections import OrderedDict
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
 
 logger = logging.getLogger()
 
+# 默认的文本日志格式
+log_format = '%(asctime)s %(levelname)s %(filename)s[ln:%(lineno)d] %(message)s'
+
+# 异步日志队列满时的处理策略
+overflow_block = 'block'
+overflow_drop_oldest = 'drop_oldest'
+overflow_drop_newest = 'drop_newest'
+
+# 通过 set_log_file() 和 set_log_stdout() 添加的 handler，key 为日志文件的绝对路径或 'stdout'
+_installed_handlers = OrderedDict()
+
+# 是否开启了日志性能统计，以及定时输出统计信息的线程
+_metrics_enabled = False
+_metrics_stop_event = None
+
 
 # 2018.5.27 v1.0.13 #13039, edit by David Yi
 # edit from https://www.jianshu.com/p/d615bf01e37b
+# v1.2.0 edit, 根据预先计算的下一个零点时间判断是否切换文件，不再每条日志都调用 strftime 和 stat
 class SafeFileHandler(FileHandler):
 
-    def __init__(self, filename, mode='a', encoding=None, delay=0):
+    def __init__(self, filename, mode='a', encoding=None, delay=0, check_interval=60):
         """
         Use the specified filename for streamed logging
+
+        check_interval is the number of seconds between checks that the
+        log file still exists, None means only check at rollover
         """
         if codecs is None:
             encoding = None
@@ -37,6 +88,11 @@ class SafeFileHandler(FileHandler):
         self.encoding = encoding
         self.suffix = "%Y-%m-%d"
         self.suffix_time = ""
+        self.check_interval = check_interval
+        self.rollover_at = 0
+        self.next_check_at = 0
+        # LogArchiver, 切换到新一天的文件后压缩和清理旧的日志文件
+        self.archiver = None
 
     def emit(self, record):
         """
@@ -57,16 +113,18 @@ class SafeFileHandler(FileHandler):
         """
         Determine if builder should occur.
 
-        record is not used, as we are just comparing times,
-        but it is needed so the method signatures are the same
+        compare record.created with the precomputed next midnight, and
+        check the log file still exists every check_interval seconds
         """
-        time_tuple = time.localtime()
-
-        if self.suffix_time != time.strftime(self.suffix, time_tuple) or not os.path.exists(
-                self.baseFilename + '.' + self.suffix_time):
+        if record.created >= self.rollover_at:
             return 1
-        else:
-            return 0
+
+        if self.check_interval is not None and record.created >= self.next_check_at:
+            self.next_check_at = record.created + self.check_interval
+            if not os.path.exists(self.baseFilename):
+                return 1
+
+        return 0
 
     def build_base_filename(self):
         """
@@ -85,15 +143,732 @@ class SafeFileHandler(FileHandler):
                 index = self.baseFilename.rfind(".")
             self.baseFilename = self.baseFilename[:index]
 
+        old_suffix_time = self.suffix_time
+
         # add new suffix
-        current_time_tuple = time.localtime()
+        now = time.time()
+        current_time_tuple = time.localtime(now)
         self.suffix_time = time.strftime(self.suffix, current_time_tuple)
         self.baseFilename = self.baseFilename + "." + self.suffix_time
 
+        # next local midnight, mktime normalizes the day overflow
+        self.rollover_at = time.mktime((current_time_tuple.tm_year, current_time_tuple.tm_mon,
+                                        current_time_tuple.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+        if self.check_interval is not None:
+            self.next_check_at = now + self.check_interval
+
         self.mode = 'a'
         if not self.delay:
             self.stream = self._open()
 
+        # 第一次打开文件时也处理一次，之前运行留下的旧文件和运行不到一天的进程的文件同样会被压缩和清理
+        if self.archiver is not None and old_suffix_time != self.suffix_time:
+            self.archiver.archive(self.baseFilename[:-len(self.suffix_time) - 1],
+                                  self.baseFilename)
+
+    def close(self):
+        """
+        Close the stream, and stop the archiver thread after its queued jobs
+        """
+        FileHandler.close(self)
+        if self.archiver is not None:
+            self.archiver.stop()
+
+
+def _lock_file(fd):
+    # 对文件加非阻塞的排他锁，已经被其他进程锁住时返回 False，不支持文件锁的平台直接返回 True
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except (IOError, OSError):
+        return False
+    return True
+
+
+# v1.2.0 create
+class LogArchiver(object):
+    """
+    在后台线程中压缩和清理按天切换后的旧日志文件，压缩和清理都不会在写日志的线程中进行；
+
+    SafeFileHandler 第一次打开日志文件和切换到新一天的文件后，会把除当天文件以外未压缩的 name.log.YYYY-MM-DD
+    文件压缩为 .gz 或 .zst 文件，然后按照保留个数和总大小删除最早的文件；handler 关闭时后台线程处理完剩余的任务后退出；
+    统计信息可以通过 stats() 或者 get_log_metrics() 获取
+
+    处理前会对 name.log.archive.lock 文件加非阻塞的排他锁，多进程模式下各进程都有自己的 LogArchiver，
+    同一时间只有拿到锁的进程进行压缩和清理，其他进程跳过本次处理
+
+    :param:
+        * compression: (string) 压缩格式，'gzip' 或 'zstd'，zstd 需要安装 zstandard，默认为 'gzip'
+        * backup_count: (int) 最多保留的旧日志文件个数，默认为 None 不限制
+        * max_total_size: (int) 旧日志文件的最大总字节数，默认为 None 不限制
+        * delay: (float) 切换后等待多少秒再处理，多进程写入时可以等待其他进程切换完成，默认为 0
+        * compresslevel: (int) 压缩级别，默认为 None，使用各压缩格式的默认级别
+
+    举例如下::
+
+        from fishbase.fish_logger import *
+
+        set_log_file('fish_test.log', archive='gzip', backup_count=30)
+
+    """
+
+    _suffix_pattern = r'\.\d{4}-\d{2}-\d{2}(\.gz|\.zst)?$'
+
+    def __init__(self, compression='gzip', backup_count=None, max_total_size=None, delay=0,
+                 compresslevel=None):
+        if compression not in ('gzip', 'zstd'):
+            raise ValueError('compression should be gzip or zstd, but we got {}'.format(compression))
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError('zstd compression is not supported, zstandard module not found')
+        self.compression = compression
+        self.backup_count = backup_count
+        self.max_total_size = max_total_size
+        self.delay = delay
+        self.compresslevel = compresslevel
+
+        self.files_compressed = 0
+        self.files_removed = 0
+        self.bytes_reclaimed = 0
+        self.errors = 0
+        # 其他进程正在处理而跳过的次数
+        self.skipped = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def archive(self, base_filename, current_filename):
+        """
+        Queue the rotated files of base_filename for compression and cleanup
+        """
+        self._queue.put((base_filename, current_filename))
+
+    def join(self):
+        """
+        Wait until all queued jobs are done
+        """
+        self._queue.join()
+
+    def stop(self):
+        """
+        Stop the background thread after the queued jobs are done
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+
+    def stats(self):
+        return {'files_compressed': self.files_compressed, 'files_removed': self.files_removed,
+                'bytes_reclaimed': self.bytes_reclaimed, 'errors': self.errors,
+                'skipped': self.skipped}
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            base_filename, current_filename = job
+            try:
+                if self.delay:
+                    time.sleep(self.delay)
+                self._process(base_filename, current_filename)
+            except Exception:
+                self.errors += 1
+            finally:
+                self._queue.task_done()
+
+    def _rotated_files(self, base_filename, current_filename):
+        log_dir = os.path.dirname(base_filename) or '.'
+        pattern = re.compile(re.escape(os.path.basename(base_filename)) + self._suffix_pattern)
+        files = [os.path.join(log_dir, name) for name in os.listdir(log_dir) if pattern.match(name)]
+        # 文件名中的日期保证按名称排序即按时间排序
+        return sorted(f for f in files if f != current_filename)
+
+    def _compress(self, filename):
+        ext = '.gz' if self.compression == 'gzip' else '.zst'
+        tmp_filename = '{}{}.{}.tmp'.format(filename, ext, os.getpid())
+        with open(filename, 'rb') as src:
+            if self.compression == 'gzip':
+                level = 9 if self.compresslevel is None else self.compresslevel
+                with gzip.open(tmp_filename, 'wb', compresslevel=level) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            else:
+                level = 3 if self.compresslevel is None else self.compresslevel
+                with open(tmp_filename, 'wb') as dst:
+                    zstandard.ZstdCompressor(level=level).copy_stream(src, dst)
+        os.rename(tmp_filename, filename + ext)
+        try:
+            original_size = os.path.getsize(filename)
+            os.remove(filename)
+        except OSError:
+            # 其他进程已经处理了这个文件
+            return
+        self.files_compressed += 1
+        self.bytes_reclaimed += original_size - os.path.getsize(filename + ext)
+
+    def _process(self, base_filename, current_filename):
+        lock_fd = os.open(base_filename + '.archive.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if _lock_file(lock_fd):
+                self._archive(base_filename, current_filename)
+            else:
+                self.skipped += 1
+        finally:
+            # 关闭文件时释放锁
+            os.close(lock_fd)
+
+    def _archive(self, base_filename, current_filename):
+        for filename in self._rotated_files(base_filename, current_filename):
+            if not filename.endswith(('.gz', '.zst')):
+                try:
+                    self._compress(filename)
+                except (IOError, OSError):
+                    self.errors += 1
+
+        files = self._rotated_files(base_filename, current_filename)
+        if self.backup_count is not None:
+            while len(files) > self.backup_count:
+                self._remove(files.pop(0))
+        if self.max_total_size is not None:
+            sizes = [os.path.getsize(f) for f in files]
+            while files and sum(sizes) > self.max_total_size:
+                self._remove(files.pop(0))
+                sizes.pop(0)
+
+    def _remove(self, filename):
+        try:
+            size = os.path.getsize(filename)
+            os.remove(filename)
+        except OSError:
+            return
+        self.files_removed += 1
+        self.bytes_reclaimed += size
+
+
+# v1.2.0 create
+class BufferedSafeFileHandler(SafeFileHandler):
+    """
+    带缓冲的 SafeFileHandler，格式化后的日志先放在内存中，满足以下任一条件时一次性写入文件：
+    缓冲的记录数达到 capacity，缓冲的字符数达到 buffer_size，距离第一条缓冲记录超过 flush_interval 毫秒，
+    或者记录的级别不低于 flush_level；另有后台线程每隔 flush_interval 毫秒检查一次，保证空闲时缓冲也能写入
+    """
+
+    def __init__(self, filename, mode='a', encoding=None, delay=0, check_interval=60,
+                 capacity=1000, buffer_size=64 * 1024, flush_interval=1000,
+                 flush_level=logging.ERROR):
+        SafeFileHandler.__init__(self, filename, mode, encoding, delay, check_interval)
+        self.capacity = capacity
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self.buffer = []
+        self.buffered_size = 0
+        self.first_buffered_at = None
+
+        self._stop_event = threading.Event()
+        self._flush_thread = None
+        if flush_interval:
+            self._flush_thread = threading.Thread(target=self._flush_loop)
+            self._flush_thread.daemon = True
+            self._flush_thread.start()
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval / 1000.0):
+            self.flush()
+
+    def emit(self, record):
+        """
+        Emit a record.
+
+        Format the record into the buffer and flush when needed
+        """
+        try:
+            if self.check_base_filename(record):
+                self.flush()
+                self.build_base_filename()
+            msg = self.format(record) + self.terminator
+            if self.first_buffered_at is None:
+                self.first_buffered_at = record.created
+            self.buffer.append(msg)
+            self.buffered_size += len(msg)
+            if self.should_flush(record):
+                self.flush()
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            self.handleError(record)
+
+    def should_flush(self, record):
+        return (record.levelno >= self.flush_level or
+                len(self.buffer) >= self.capacity or
+                self.buffered_size >= self.buffer_size or
+                (self.flush_interval is not None and
+                 (record.created - self.first_buffered_at) * 1000 >= self.flush_interval))
+
+    def flush(self):
+        """
+        Write all buffered records with one write() call
+        """
+        self.acquire()
+        try:
+            if self.buffer:
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write(''.join(self.buffer))
+                self.buffer = []
+                self.buffered_size = 0
+                self.first_buffered_at = None
+            if self.stream and hasattr(self.stream, 'flush'):
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self._stop_event.set()
+        self.flush()
+        SafeFileHandler.close(self)
+
+
+# v1.2.0 create
+class ProcessSafeFileHandler(SafeFileHandler):
+    """
+    多进程安全的 SafeFileHandler，适用于 gunicorn、multiprocessing 等多个进程写同一个日志文件的场景；
+
+    各进程都以 O_APPEND 方式直接打开带日期后缀的日志文件，不做任何重命名，零点后各自切换到新日期的文件；
+    每条日志编码后通过一次不带缓冲的 write() 写入，超过 max_record_size 字节的日志会被截断，
+    保证不同进程的日志行不会互相穿插
+    """
+
+    def __init__(self, filename, encoding='utf-8', delay=0, check_interval=60,
+                 max_record_size=64 * 1024):
+        SafeFileHandler.__init__(self, filename, 'a', encoding, delay, check_interval)
+        self.max_record_size = max_record_size
+
+    def _open(self):
+        return open(self.baseFilename, 'ab', buffering=0)
+
+    def emit(self, record):
+        """
+        Emit a record.
+
+        Write the whole record with one unbuffered O_APPEND write
+        """
+        try:
+            if self.check_base_filename(record):
+                self.build_base_filename()
+            if self.stream is None:
+                self.stream = self._open()
+            encoding = self.encoding or 'utf-8'
+            data = (self.format(record) + self.terminator).encode(encoding)
+            if len(data) > self.max_record_size:
+                tail = ('...' + self.terminator).encode(encoding)
+                # 按字符边界截断，不会留下半个多字节字符
+                data = data[:self.max_record_size - len(tail)].decode(encoding, 'ignore').encode(encoding)
+                data += tail
+            self.stream.write(data)
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            self.handleError(record)
+
+
+# v1.2.0 create
+class FishQueueHandler(QueueHandler):
+    """
+    将日志记录放入有界队列的 handler，由 FishQueueListener 的后台线程负责实际写入；
+
+    队列满时根据 overflow 处理：overflow_block 阻塞等待，overflow_drop_oldest 丢弃最早的记录，
+    overflow_drop_newest 丢弃当前记录；丢弃的记录数保存在 dropped 中；
+    overflow_drop_oldest 不会丢弃 listener 停止时放入的结束标记；关闭时会同时停止对应的 listener，并取消程序退出时停止 listener 的注册
+    """
+
+    def __init__(self, log_queue, overflow=overflow_block):
+        if overflow not in (overflow_block, overflow_drop_oldest, overflow_drop_newest):
+            raise ValueError('overflow should be one of {}, {}, {}, but we got {}'.format(
+                overflow_block, overflow_drop_oldest, overflow_drop_newest, overflow))
+        QueueHandler.__init__(self, log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+        self.listener = None
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            atexit.unregister(self.listener.stop)
+        QueueHandler.close(self)
+
+    def prepare(self, record):
+        # 队列在同一个进程中，不需要像 QueueHandler.prepare() 那样把异常信息合并到 message 中，
+        # 保留 exc_info 由目标 handler 的 formatter 处理，JsonFormatter 才能单独输出 exc_info 字段
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self.overflow == overflow_block:
+            self.queue.put(record)
+            return
+        if self.overflow == overflow_drop_newest:
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    dropped = self.queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self.dropped += 1
+                if dropped is QueueListener._sentinel:
+                    # listener 正在停止，放回结束标记，丢弃当前记录，否则 stop() 会一直等待
+                    self.queue.put(dropped)
+                    return
+
+
+# v1.2.0 create
+class FishQueueListener(QueueListener):
+    """
+    从队列中取出日志记录并交给实际 handler 写入的后台线程，停止时会写完队列中剩余的记录并关闭 handler
+    """
+
+    def enqueue_sentinel(self):
+        # 队列满时也要保证结束标记能放入队列
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        QueueListener.stop(self)
+        for handler in self.handlers:
+            handler.close()
+
+
+# v1.2.0 create
+class JsonFormatter(logging.Formatter):
+    """
+    将日志记录格式化为一行 JSON 的 formatter，方便日志系统直接解析；
+
+    输出的字段在初始化时确定，时间字符串按秒缓存，同一秒内的日志只需要补上毫秒；
+    通过 logger.info('msg', extra={'key': value}) 传入的额外字段也会一起输出
+
+    :param:
+        * fields: (list) 输出字段，元素为 (json key, LogRecord 属性名) 的 tuple，默认为 default_fields
+        * extra: (bool) 是否输出额外字段，默认为 True
+        * datefmt: (string) 时间格式，默认为 '%Y-%m-%d %H:%M:%S'
+
+    举例如下::
+
+        import logging
+        from fishbase.fish_logger import *
+
+        set_log_stdout(json_format=True)
+        logger.info('test fish base log', extra={'user': 'david'})
+
+    执行结果::
+
+        {"time":"2019-05-01 10:00:00,123","level":"INFO","file":"demo.py","line":6,"message":"test fish base log","user":"david"}
+
+    """
+
+    default_fields = (('time', 'asctime'), ('level', 'levelname'), ('file', 'filename'),
+                      ('line', 'lineno'), ('message', 'message'))
+
+    # LogRecord 的标准属性，不属于额外字段
+    _record_attrs = frozenset(vars(logging.makeLogRecord({}))) | frozenset(['message', 'asctime'])
+
+    def __init__(self, fields=None, extra=True, datefmt=None):
+        logging.Formatter.__init__(self, datefmt=datefmt)
+        self.fields = tuple(fields if fields is not None else self.default_fields)
+        self.extra = extra
+        self._use_time = any(attr == 'asctime' for _, attr in self.fields)
+        self._time_cache = (None, None)
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'),
+                                        default=str).encode
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        cached_second, cached_text = self._time_cache
+        if cached_second != second:
+            cached_text = time.strftime(datefmt or self.datefmt or '%Y-%m-%d %H:%M:%S',
+                                        self.converter(record.created))
+            self._time_cache = (second, cached_text)
+        return '%s,%03d' % (cached_text, record.msecs)
+
+    def format(self, record):
+        record.message = record.getMessage()
+        if self._use_time:
+            record.asctime = self.formatTime(record)
+
+        data = {}
+        for key, attr in self.fields:
+            data[key] = getattr(record, attr, None)
+
+        if self.extra:
+            for key, value in record.__dict__.items():
+                if key not in self._record_attrs:
+                    data[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc_info'] = record.exc_text
+        if getattr(record, 'stack_info', None):
+            data['stack_info'] = self.formatStack(record.stack_info)
+
+        return self._encode(data)
+
+
+# v1.2.0 create
+class RateLimitFilter(logging.Filter):
+    """
+    日志去重限流 filter，可以加到任意 logger 或 handler 上；
+
+    同一位置（文件、行号、日志模板）的日志在 window 秒内只输出第一条，其余的被抑制并计数，
+    下一个时间窗口中该位置再次输出日志时，会在日志后加上 (suppressed N similar)；
+    该位置被 LRU 淘汰时，或者调用 flush() 时，未输出的计数以最后一条被抑制的日志输出为汇总日志；
+    级别不高于 sample_level 的日志还可以按 sample_rate 概率采样；各位置的状态保存在最多 max_keys 个的 LRU 中
+
+    :param:
+        * window: (float) 去重的时间窗口，单位秒，默认为 1
+        * sample_rate: (float) 低级别日志的采样比例，0 到 1 之间，默认为 1 即不采样
+        * sample_level: (int) 采样的日志级别上限，默认为 logging.INFO
+        * max_keys: (int) 最多保存多少个位置的状态，默认为 1024
+
+    举例如下::
+
+        from fishbase.fish_logger import *
+
+        set_log_stdout()
+        rate_limit_filter = RateLimitFilter(window=1, sample_rate=0.1)
+        logger.addFilter(rate_limit_filter)
+        for i in range(10000):
+            logger.warning('hot loop warning %d', i)
+        rate_limit_filter.flush()
+
+    """
+
+    def __init__(self, window=1, sample_rate=1, sample_level=logging.INFO, max_keys=1024):
+        logging.Filter.__init__(self)
+        self.window = window
+        self.sample_rate = sample_rate
+        self.sample_level = sample_level
+        self.max_keys = max_keys
+        self.suppressed = 0
+        self.sampled_out = 0
+        # key -> [window start time, suppressed count, last suppressed record]
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if getattr(record, 'rate_limit_summary', False):
+            return True
+
+        if self.sample_rate < 1 and record.levelno <= self.sample_level:
+            if random.random() >= self.sample_rate:
+                self.sampled_out += 1
+                return False
+
+        key = (record.pathname, record.lineno, record.msg)
+        evicted = None
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                # 每次命中都刷新 LRU 位置，频繁输出的位置不会被优先淘汰
+                self._states.move_to_end(key)
+                if record.created - state[0] < self.window:
+                    state[1] += 1
+                    state[2] = record
+                    self.suppressed += 1
+                    return False
+
+            count = state[1] if state is not None else 0
+            self._states[key] = [record.created, 0, None]
+            if state is None and len(self._states) > self.max_keys:
+                evicted = self._states.popitem(last=False)[1]
+
+        # 被淘汰的位置还有未输出的抑制计数时，输出汇总，避免计数丢失
+        if evicted is not None and evicted[1]:
+            self.emit_summary(evicted[2], evicted[1])
+        if count:
+            record.msg = '{} (suppressed {} similar)'.format(record.msg, count)
+        return True
+
+    def flush(self):
+        """
+        对所有还有未输出抑制计数的位置输出汇总日志，比如在循环结束或者程序退出前调用
+
+        :return:
+            * count: (int) 输出的汇总日志条数
+        """
+        pending = []
+        with self._lock:
+            for state in self._states.values():
+                if state[1]:
+                    pending.append((state[2], state[1]))
+                    state[1] = 0
+                    state[2] = None
+        for record, count in pending:
+            self.emit_summary(record, count)
+        return len(pending)
+
+    def emit_summary(self, record, count):
+        """
+        以最后一条被抑制的日志为模板，通过其所属的 logger 输出 '<msg> (suppressed N similar)'，
+        汇总日志不会再被本 filter 抑制；需要其他输出方式时可以在子类中重写
+
+        :param:
+            * record: (LogRecord) 最后一条被抑制的日志
+            * count: (int) 被抑制的日志条数
+        :return: 无
+        """
+        summary = logging.makeLogRecord(record.__dict__)
+        summary.msg = '{} (suppressed {} similar)'.format(record.msg, count)
+        summary.rate_limit_summary = True
+        summary_logger = logger if record.name == logger.name else logging.getLogger(record.name)
+        summary_logger.handle(summary)
+
+
+# v1.2.0 create
+class LogMetrics(object):
+    """
+    单个 handler 的性能统计，包括 emit 耗时分布、记录数、写入字节数，由 enable_log_metrics() 创建
+    """
+
+    # emit 耗时分布的分桶上限，单位秒
+    latency_buckets = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.records = 0
+        self.bytes_written = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.histogram = [0] * (len(self.latency_buckets) + 1)
+
+    def observe(self, seconds):
+        self.records += 1
+        self.latency_total += seconds
+        if seconds > self.latency_max:
+            self.latency_max = seconds
+        self.histogram[bisect.bisect_left(self.latency_buckets, seconds)] += 1
+
+    def snapshot(self):
+        elapsed = time.time() - self.started
+        bucket_names = ['<={}us'.format(int(b * 1000000)) for b in self.latency_buckets]
+        bucket_names.append('>{}us'.format(int(self.latency_buckets[-1] * 1000000)))
+        return {
+            'records': self.records,
+            'records_per_sec': self.records / elapsed if elapsed > 0 else 0.0,
+            'bytes_written': self.bytes_written,
+            'latency_avg_us': (self.latency_total / self.records * 1000000
+                               if self.records else 0.0),
+            'latency_max_us': self.latency_max * 1000000,
+            'latency_histogram': OrderedDict(zip(bucket_names, self.histogram)),
+        }
+
+
+def _stream_encoding(handler, stream):
+    # 返回实际写入时的 (编码, 换行符)：文本流按流的编码写入，'\n' 转换为 os.linesep；
+    # 二进制流由 handler 按自己的编码写入，没有指定编码时与 open() 一样使用 locale 的编码
+    encoding = getattr(stream, 'encoding', None)
+    if encoding:
+        return encoding, os.linesep
+    return getattr(handler, 'encoding', None) or locale.getpreferredencoding(False), '\n'
+
+
+def _instrument_handler(handler):
+    # 用实例属性替换 emit 和 format，关闭统计时删除实例属性即可恢复，未开启时没有任何额外开销
+    if getattr(handler, 'metrics', None) is not None:
+        return
+    metrics = LogMetrics()
+    emit = handler.emit
+    format_record = handler.format
+    timer = getattr(time, 'perf_counter', time.time)
+    terminator = getattr(handler, 'terminator', '')
+    # [stream, 编码, 换行符]，stream 变化时重新获取
+    output = [None, None, None]
+
+    def timed_emit(record):
+        start = timer()
+        emit(record)
+        metrics.observe(timer() - start)
+
+    def counted_format(record):
+        msg = format_record(record)
+        stream = getattr(handler, 'stream', None)
+        if stream is not output[0]:
+            output[:] = [stream] + list(_stream_encoding(handler, stream))
+        text = msg + terminator
+        if output[2] != '\n':
+            text = text.replace('\n', output[2])
+        metrics.bytes_written += len(text.encode(output[1], 'replace'))
+        return msg
+
+    handler.emit = timed_emit
+    handler.format = counted_format
+    handler.metrics = metrics
+
+
+def _uninstrument_handler(handler):
+    if getattr(handler, 'metrics', None) is None:
+        return
+    del handler.emit
+    del handler.format
+    handler.metrics = None
+
+
+def _iter_metrics_handlers():
+    for key, handler in _installed_handlers.items():
+        yield key, handler
+        listener = getattr(handler, 'listener', None)
+        if listener is not None:
+            for i, inner_handler in enumerate(listener.handlers):
+                yield '{}#writer{}'.format(key, i), inner_handler
+
+
+def _get_formatter(json_format):
+    if json_format:
+        return JsonFormatter()
+    return logging.Formatter(log_format)
+
+
+def _install_handler(key, handler):
+    # 同一个 key 重复设置时替换原来的 handler，避免同一条日志被重复写入
+    old_handler = _installed_handlers.pop(key, None)
+    if old_handler is not None:
+        logger.removeHandler(old_handler)
+        old_handler.close()
+
+    _installed_handlers[key] = handler
+    if _metrics_enabled:
+        for _, instrumented in _iter_metrics_handlers():
+            _instrument_handler(instrumented)
+    logger.addHandler(handler)
+    logger.setLevel(min(h.level for h in _installed_handlers.values()))
+
+
+def _make_async_handler(handler, queue_size, overflow):
+    listener = FishQueueListener(queue.Queue(queue_size), handler, respect_handler_level=True)
+    queue_handler = FishQueueHandler(listener.queue, overflow=overflow)
+    queue_handler.setLevel(handler.level)
+    queue_handler.listener = listener
+    listener.start()
+    atexit.register(listener.stop)
+    return queue_handler
+
 
 # 设置日志记录，按照每天一个文件，记录包括 info 以及以上级别的内容
 # 输入: local_file 日志文件名
@@ -101,14 +876,46 @@ class SafeFileHandler(FileHandler):
 # 2018.2.11 edit, log 相关代码优化简化; #11010
 # 2018.2.13 edit, remove thread watch
 # 2018.4.23 edit，#19023 增加 docstring
-def set_log_file(local_file=None):
+# v1.2.0 edit, 增加异步写入模式、缓冲写入模式和多进程安全模式
+def set_log_file(local_file=None, async_mode=False, queue_size=10000, overflow=overflow_block,
+                 buffered=False, buffer_capacity=1000, buffer_size=64 * 1024, flush_interval=1000,
+                 process_safe=False, json_format=False, level=logging.INFO,
+                 archive=None, backup_count=None, max_total_size=None):
 
     """
-    设置日志记录，按照每天一个文件，记录包括 info 以及以上级别的内容；
+    设置日志记录，按照每天一个文件，默认记录包括 info 以及以上级别的内容；
     日志格式采取日志文件名直接加上日期，比如 fish_test.log.2018-05-27
 
+    对同一个日志文件重复调用时会替换之前添加的 handler，不会重复写入；可以通过 teardown() 移除并关闭；
+
+    设置 archive 后，第一次写入日志和每天切换日志文件时会在后台线程中压缩旧的日志文件，并按照 backup_count 和
+    max_total_size 清理最早的文件，多进程时通过锁文件保证同一时间只有一个进程处理，详见 LogArchiver
+
+    异步模式下日志记录先放入有界队列，由独立的后台线程写入文件，调用线程不会因为磁盘写入而阻塞；
+    程序退出时会自动写完队列中剩余的日志；
+
+    缓冲模式下日志先缓存在内存中，达到条数、大小或时间间隔后一次性写入文件，ERROR 及以上级别的日志会立即写入；
+    两种模式可以同时使用；
+
+    多进程安全模式下各进程以 O_APPEND 方式直接写入带日期后缀的日志文件，每条日志一次 write()，
+    适用于 gunicorn、multiprocessing 等多进程场景，不能与缓冲模式同时使用
+
     :param:
         * local_fie: (string) 日志文件名
+        * async_mode: (bool) 是否使用异步写入模式，默认为 False
+        * queue_size: (int) 异步模式下队列的最大长度，默认为 10000
+        * overflow: (string) 异步模式下队列满时的处理策略，默认为 overflow_block 阻塞等待，
+          也可以是 overflow_drop_oldest 丢弃最早的记录，overflow_drop_newest 丢弃最新的记录
+        * buffered: (bool) 是否使用缓冲写入模式，默认为 False
+        * buffer_capacity: (int) 缓冲模式下缓冲的最大记录数，默认为 1000
+        * buffer_size: (int) 缓冲模式下缓冲的最大字符数，默认为 64K
+        * flush_interval: (int) 缓冲模式下最长的缓冲时间，单位毫秒，默认为 1000
+        * process_safe: (bool) 是否使用多进程安全模式，默认为 False
+        * json_format: (bool) 是否使用 JsonFormatter 每条日志输出一行 JSON，默认为 False
+        * level: (int) 记录的日志级别，默认为 logging.INFO
+        * archive: (string) 旧日志文件的压缩格式，'gzip' 或 'zstd'，默认为 None 不压缩也不清理
+        * backup_count: (int) 设置 archive 后最多保留的旧日志文件个数，默认为 None 不限制
+        * max_total_size: (int) 设置 archive 后旧日志文件的最大总字节数，默认为 None 不限制
     :return: 无
 
     举例如下::
@@ -130,29 +937,46 @@ def set_log_file(local_file=None):
 
     default_log_file = 'default.log'
 
-    _formatter = logging.Formatter(
-        '%(asctime)s %(levelname)s %(filename)s[ln:%(lineno)d] %(message)s')
+    _formatter = _get_formatter(json_format)
 
     if local_file is not None:
         default_log_file = local_file
 
     # time rotating file handler
     # _tfh = TimedRotatingFileHandler(default_log_file, when="midnight")
-    _tfh = SafeFileHandler(filename=default_log_file)
-    _tfh.setLevel(logging.INFO)
+    if buffered and process_safe:
+        raise ValueError('buffered and process_safe can not be used together')
+
+    if process_safe:
+        _tfh = ProcessSafeFileHandler(filename=default_log_file)
+    elif buffered:
+        _tfh = BufferedSafeFileHandler(filename=default_log_file, capacity=buffer_capacity,
+                                       buffer_size=buffer_size, flush_interval=flush_interval)
+    else:
+        _tfh = SafeFileHandler(filename=default_log_file)
+    _tfh.setLevel(level)
     _tfh.setFormatter(_formatter)
 
-    logger.setLevel(logging.INFO)
+    if archive is not None:
+        _tfh.archiver = LogArchiver(archive, backup_count=backup_count,
+                                    max_total_size=max_total_size,
+                                    delay=60 if process_safe else 0)
 
-    logger.addHandler(_tfh)
+    if async_mode:
+        _tfh = _make_async_handler(_tfh, queue_size, overflow)
+
+    _install_handler(os.path.abspath(default_log_file), _tfh)
 
 
 # 2019.4.16 edit by jun.hu #221
-def set_log_stdout():
+# v1.2.0 edit, 增加 json_format 和 level 参数，重复调用不再重复输出
+def set_log_stdout(json_format=False, level=logging.INFO):
     """
-    设置输出到标准输出中
+    设置输出到标准输出中，重复调用时会替换之前添加的 handler
 
-    :param: 无
+    :param:
+        * json_format: (bool) 是否使用 JsonFormatter 每条日志输出一行 JSON，默认为 False
+        * level: (int) 输出的日志级别，默认为 logging.INFO
     :return: 无
 
     举例如下::
@@ -167,11 +991,131 @@ def set_log_stdout():
 
         print('log ok')
     """
-    _formatter = logging.Formatter(
-        '%(asctime)s %(levelname)s %(filename)s[ln:%(lineno)d] %(message)s')
+    _formatter = _get_formatter(json_format)
 
-    logger.setLevel(logging.INFO)
     stdout_handler = logging.StreamHandler(sys.stdout)
+    stdout_handler.setLevel(level)
     stdout_handler.setFormatter(_formatter)
 
-    logger.addHandler(stdout_handler)
+    _install_handler('stdout', stdout_handler)
+
+
+# v1.2.0 create
+def teardown():
+    """
+    移除并关闭通过 set_log_file() 和 set_log_stdout() 添加的所有 handler，释放打开的日志文件，同时关闭性能统计
+
+    :param: 无
+    :return: 无
+
+    举例如下::
+
+        from fishbase.fish_logger import *
+
+        set_log_file('fish_test.log')
+        logger.info('test fish base log')
+        teardown()
+
+    """
+    disable_log_metrics()
+    while _installed_handlers:
+        handler = _installed_handlers.popitem()[1]
+        logger.removeHandler(handler)
+        handler.close()
+
+
+# v1.2.0 create
+def enable_log_metrics(log_interval=None):
+    """
+    开启通过 set_log_file() 和 set_log_stdout() 添加的 handler 的性能统计，之后添加的 handler 也会统计；
+    异步模式下同时统计调用线程放入队列和后台线程写入文件两部分；未开启时没有任何额外开销
+
+    :param:
+        * log_interval: (float) 每隔多少秒通过 logger 输出一次统计信息，默认为 None 不输出
+    :return: 无
+
+    举例如下::
+
+        from fishbase.fish_logger import *
+
+        set_log_file('fish_test.log', async_mode=True)
+        enable_log_metrics()
+
+        logger.info('test fish base log')
+        print(get_log_metrics())
+
+    """
+    global _metrics_enabled, _metrics_stop_event
+    _metrics_enabled = True
+    for _, handler in _iter_metrics_handlers():
+        _instrument_handler(handler)
+
+    if log_interval and _metrics_stop_event is None:
+        _metrics_stop_event = threading.Event()
+
+        def log_metrics(stop_event):
+            while not stop_event.wait(log_interval):
+                logger.info('fishbase log metrics: %s', json.dumps(get_log_metrics()))
+
+        metrics_thread = threading.Thread(target=log_metrics, args=(_metrics_stop_event,))
+        metrics_thread.daemon = True
+        metrics_thread.start()
+
+
+# v1.2.0 create
+def disable_log_metrics():
+    """
+    关闭日志性能统计，恢复 handler 原来的 emit 和 format，并停止定时输出
+
+    :param: 无
+    :return: 无
+    """
+    global _metrics_enabled, _metrics_stop_event
+    _metrics_enabled = False
+    if _metrics_stop_event is not None:
+        _metrics_stop_event.set()
+        _metrics_stop_event = None
+    for _, handler in _iter_metrics_handlers():
+        _uninstrument_handler(handler)
+
+
+# v1.2.0 create
+def get_log_metrics():
+    """
+    获取各个 handler 的性能统计快照；异步模式还包括队列长度 queue_depth 和丢弃的记录数 dropped；
+    设置了 archive 的日志文件还包括压缩和清理的统计 archive，未开启性能统计时也会返回；
+    后台写入线程对应的 handler 的 key 为 '<key>#writer0'
+
+    :param: 无
+    :return:
+        * metrics: (dict) key 为日志文件的绝对路径或 'stdout'，value 为统计信息字典
+
+    举例如下::
+
+        from fishbase.fish_logger import *
+
+        set_log_stdout()
+        enable_log_metrics()
+        logger.info('test fish base log')
+        print(get_log_metrics())
+
+    执行结果::
+
+        {'stdout': {'records': 1, 'records_per_sec': 1520.4, 'bytes_written': 62,
+        'latency_avg_us': 35.2, 'latency_max_us': 35.2, 'latency_histogram': ...}}
+
+    """
+    metrics = OrderedDict()
+    for key, handler in _iter_metrics_handlers():
+        handler_metrics = getattr(handler, 'metrics', None)
+        archiver = getattr(handler, 'archiver', None)
+        if handler_metrics is None and archiver is None:
+            continue
+        snapshot = handler_metrics.snapshot() if handler_metrics is not None else OrderedDict()
+        if isinstance(handler, FishQueueHandler):
+            snapshot['queue_depth'] = handler.queue.qsize()
+            snapshot['dropped'] = handler.dropped
+        if archiver is not None:
+            snapshot['archive'] = archiver.stats()
+        metrics[key] = snapshot
+    return metrics
@@ -10,6 +10,12 @@ from __future__ import print_function
 import yaml
 import os
 
+# 优先使用 LibYAML 的 C 实现解析 yaml，没有安装时使用纯 Python 实现
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 
 package_yml = """
 project: hellopackage
@@ -61,6 +67,7 @@ tree:
 
 # 通过配置文件初始化一个project
 # create 2018.8.3 by Jia ChunYing
+# v1.2.0 edit, 使用 CSafeLoader 解析, 读取后关闭配置文件
 def init_project_by_yml(project_config=None, dist=None):
     """
         通过配置文件初始化一个 project
@@ -99,10 +106,12 @@ def init_project_by_yml(project_config=None, dist=None):
             ['demo', 'requirements.txt', 'test', 'MANIFEST.in', 'hellopackage', 'README.md', 'setup.py', 'doc']
             ---
     """
-    if os.path.isfile(project_config):
-        project_config = open(project_config)
     try:
-        yml_data = yaml.load(project_config)
+        if os.path.isfile(project_config):
+            with open(project_config) as f:
+                yml_data = yaml.load(f, Loader=YamlLoader)
+        else:
+            yml_data = yaml.load(project_config, Loader=YamlLoader)
         project_name = yml_data['project']
         project_tree = yml_data['tree']
     except Exception as e:
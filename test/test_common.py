@@ -2,6 +2,8 @@
 # fish_common.py 单元测试
 # 2018.5.15 create by David Yi
 import string
+import datetime
+import enum
 import pytest
 
 from fishbase.fish_common import *
@@ -442,3 +444,367 @@ class TestFishCommon(object):
         assert hasattr(new_obj.user, 'name')
         assert new_obj.user.name.last_name == 'zhang'
         assert new_obj.user.address == 'Beijing'
+
+    # 测试 LazyDeserializeInstance tc
+    @pytest.mark.parametrize('slots', [False, True])
+    def test_lazy_deserialize_instance_01(self, slots):
+        temp_dict = {'user': {'name': {'last_name': 'zhang', 'first_name': 'san'}, 'address': 'Beijing'},
+                     'orders': [{'id': 1}, {'id': 2}], 'class': 1, 'a-b': 2}
+        new_obj = LazyDeserializeInstance(temp_dict, slots=slots)
+        assert new_obj.user.name.last_name == 'zhang'
+        assert new_obj.user.address == 'Beijing'
+        assert new_obj.user is new_obj.user
+        assert [order.id for order in new_obj.orders] == [1, 2]
+        assert getattr(new_obj, 'class') == 1
+        assert getattr(new_obj, 'a-b') == 2
+        assert 'user' in dir(new_obj)
+        assert not hasattr(new_obj, 'not_exist')
+
+        # 修改属性不影响原来的字典
+        new_obj.user.address = 'Shanghai'
+        new_obj.extra = 3
+        assert new_obj.user.address == 'Shanghai'
+        assert new_obj.extra == 3
+        assert temp_dict['user']['address'] == 'Beijing'
+
+    # 测试 LazyDeserializeInstance 生成的 __slots__ 类 tc
+    def test_lazy_deserialize_instance_02(self):
+        temp_dict = {'items': [{'id': i, 'name': str(i)} for i in range(3)]}
+        new_obj = LazyDeserializeInstance(temp_dict, slots=True)
+        first, second = new_obj.items[0], new_obj.items[1]
+        assert type(first) is type(second)
+        assert isinstance(first, LazyDeserializeInstance)
+        assert type(first).__slots__ == ('id', 'name')
+        assert second.name == '1'
+        assert type(LazyDeserializeInstance(temp_dict)) is LazyDeserializeInstance
+
+    # 测试 ConfigCache tc
+    def test_config_cache_01(self, tmpdir):
+        conf_file = str(tmpdir.join('test_conf.ini'))
+        with open(conf_file, 'w') as f:
+            f.write('[a]\nkey = 1\n')
+        config_cache = ConfigCache()
+        ds = config_cache.conf_as_dict(conf_file)
+        assert ds[0] is True
+        assert ds[1]['a']['key'] == '1'
+        assert config_cache.conf_as_dict(conf_file) is ds
+        assert config_cache.stats()['hits'] == 1
+
+        # 返回结果为只读
+        with pytest.raises(TypeError):
+            ds[1]['a']['key'] = '2'
+
+        # 文件变化后重新解析
+        with open(conf_file, 'w') as f:
+            f.write('[a]\nkey = 22\n')
+        assert config_cache.conf_as_dict(conf_file)[1]['a']['key'] == '22'
+        assert config_cache.stats()['misses'] == 2
+
+        # 不同参数分别缓存
+        config_cache.conf_as_dict(conf_file, case_sensitive=True)
+        assert config_cache.stats()['size'] == 2
+        config_cache.invalidate(conf_file)
+        assert config_cache.stats()['size'] == 0
+
+        # 读取失败不缓存
+        assert config_cache.conf_as_dict(error_conf_filename)[0] is False
+        assert config_cache.stats()['size'] == 0
+
+    # 测试 ConfigCache 后台检查 tc
+    def test_config_cache_02(self, tmpdir):
+        conf_file = str(tmpdir.join('test_conf.ini'))
+        with open(conf_file, 'w') as f:
+            f.write('[a]\nkey = 1\n')
+        config_cache = ConfigCache(poll_interval=0.05)
+        assert config_cache.conf_as_dict(conf_file)[1]['a']['key'] == '1'
+        with open(conf_file, 'w') as f:
+            f.write('[a]\nkey = 22\n')
+        time.sleep(0.3)
+        assert config_cache.stats()['reloads'] >= 1
+        assert config_cache.conf_as_dict(conf_file)[1]['a']['key'] == '22'
+        config_cache.stop()
+
+    # 测试 FishCache tc
+    def test_fish_cache_01(self):
+        cache = FishCache(maxsize=2)
+        cache.set(('a', 'b'), 1)
+        cache.set(('a_b',), 2)
+        assert cache.get(('a', 'b')) == 1
+        assert cache.get(('a_b',)) == 2
+
+        # 超过容量淘汰最久未使用的条目
+        cache.get(('a', 'b'))
+        cache.set(('c',), 3)
+        assert ('a_b',) not in cache
+        assert ('a', 'b') in cache
+        assert cache.stats()['evictions'] == 1
+
+        assert cache.invalidate(prefix=('a',)) == 1
+        assert len(cache) == 1
+
+    # 测试 FishCache 过期时间 tc
+    def test_fish_cache_02(self):
+        cache = FishCache(ttl=0.05)
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=10)
+        time.sleep(0.1)
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+        assert cache.stats()['expirations'] == 1
+
+    # 测试 FishCache.get_cf_cache() tc
+    def test_fish_cache_03(self):
+        d = conf_as_dict(conf_filename, encoding='utf-8')[1]
+        cache = FishCache()
+        assert cache.get_cf_cache(d, 'show_opt', 'short_opt') == 'b:d:v:p:f:'
+        assert cache.get_cf_cache(d, 'show_opt', 'short_opt') == 'b:d:v:p:f:'
+        assert cache.stats()['hits'] == 1
+
+        # 不同实例的缓存互不影响，按来源对象清除
+        assert len(FishCache()) == 0
+        assert cache.invalidate(source=d) == 1
+
+    # 测试 FishCache.memoize() tc
+    def test_fish_cache_04(self):
+        cache = FishCache()
+        calls = []
+
+        @cache.memoize()
+        def add(a, b=0):
+            calls.append((a, b))
+            return a + b
+
+        assert add(1, b=2) == 3
+        assert add(1, b=2) == 3
+        assert add(2) == 2
+        assert len(calls) == 2
+        add.invalidate()
+        assert add(1, b=2) == 3
+        assert len(calls) == 3
+
+    # 测试 FishCache.get_cf_cache() 重新读取配置 tc
+    def test_fish_cache_05(self):
+        cache = FishCache()
+        for i in range(50):
+            value = 'value_{}'.format(i)
+            assert cache.get_cf_cache({'s': {'k': value}}, 's', 'k') == value
+
+    # 测试 FishConfig tc
+    def test_fish_config_01(self):
+        cfg = FishConfig(conf_filename, encoding='utf-8')
+        assert bool(cfg) is True
+        assert cfg.show_opt.short_opt == 'b:d:v:p:f:'
+        assert cfg['show_opt']['Short_Opt'] == 'b:d:v:p:f:'
+        assert cfg.get_int('get_extra_rules.erule_count') == 2
+        assert cfg.get_float('get_extra_rules.erule_count') == 2.0
+        assert cfg.get_args.get_list('args') == ['download', 'test']
+        assert cfg.get_list('show_opt_common2.check', sep=',') == \
+            ['-b', '-d', '-p', '--region', '--prov', '--web_status']
+        assert cfg.get('show_opt.not_exist', 'x') == 'x'
+        assert cfg.get_int('not_exist.key') is None
+        assert 'show_opt' in cfg
+        assert cfg.as_dict() == conf_as_dict(conf_filename, encoding='utf-8')[1]
+
+        with pytest.raises(AttributeError):
+            cfg.not_exist
+        with pytest.raises(ValueError):
+            cfg.get_int('show_opt.short_opt')
+
+        assert bool(FishConfig(error_conf_filename)) is False
+
+    # 测试 FishConfig 环境变量覆盖和类型缓存 tc
+    def test_fish_config_02(self, tmpdir, monkeypatch):
+        conf_file = str(tmpdir.join('test_conf.ini'))
+        with open(conf_file, 'w') as f:
+            f.write('[DEFAULT]\ndebug=off\n\n[db.main]\nport=3306\nhosts=a; b;c\n')
+
+        monkeypatch.setenv('APP_DB_MAIN_PORT', '3307')
+        cfg = FishConfig(conf_file, env_prefix='APP_', list_sep=';')
+        assert cfg.get_int('db.main.port') == 3307
+        assert cfg.get_bool('db.main.debug') is False
+        assert cfg.get_list('db.main.hosts') == ['a', 'b', 'c']
+
+        # 转换结果已缓存，环境变量变化后需要 clear_cache()
+        monkeypatch.setenv('APP_DB_MAIN_PORT', '3308')
+        assert cfg.get_int('db.main.port') == 3307
+        cfg.clear_cache()
+        assert cfg.get_int('db.main.port') == 3308
+
+    # 测试 FishConfig 和方法同名的 key tc
+    def test_fish_config_03(self, tmpdir):
+        conf_file = str(tmpdir.join('test_conf.ini'))
+        with open(conf_file, 'w') as f:
+            f.write('[db]\nname=mydb\nkeys=a,b\nget=1\n\n[flag]\nname=x\n')
+
+        cfg = FishConfig(conf_file)
+        assert cfg.db.name == 'mydb'
+        assert cfg.db.keys == 'a,b'
+        assert cfg.db['get'] == '1'
+        assert cfg.db.section_name() == 'db'
+        assert cfg.flag.name == 'x'
+        assert cfg.get('db.name') == 'mydb'
+
+    # 测试 serialize_instance() 共享引用和循环引用 tc
+    def test_serialize_instance_02(self):
+        class ObjA(object):
+            def __init__(self, a, b):
+                self.a = a
+                self.b = b
+
+        class Color(enum.IntEnum):
+            red = 1
+
+        # 共享的对象每次都完整序列化，基本类型和容器原样输出
+        shared = ObjA(1, None)
+        obj_a = ObjA(shared, ObjA(shared, (1, 2)))
+        obj_a.c = 1 + 2j
+        obj_a.color = Color.red
+        obj_a.items = {1, 2}
+        obj_attr_dict = serialize_instance(obj_a)
+        assert obj_attr_dict['a'] == {'__classname__': 'ObjA', 'a': 1, 'b': None}
+        assert obj_attr_dict['b']['a'] == obj_attr_dict['a']
+        assert obj_attr_dict['b']['b'] == (1, 2)
+        assert obj_attr_dict['c'] == 1 + 2j
+        assert obj_attr_dict['color'] is Color.red
+        assert obj_attr_dict['items'] == {1, 2}
+        assert '__id__' not in obj_attr_dict['a']
+        new_obj = DeserializeInstance(obj_attr_dict)
+        assert new_obj.b.a.a == 1
+
+        # 循环引用输出为引用
+        obj_a = ObjA(1, ObjA(2, None))
+        obj_a.b.b = obj_a
+        obj_attr_dict = serialize_instance(obj_a)
+        assert obj_attr_dict['b']['b'] == {'__ref__': obj_attr_dict['__id__']}
+
+        new_obj = deserialize_instance(obj_attr_dict, classes=[ObjA])
+        assert isinstance(new_obj, ObjA)
+        assert new_obj.b.b is new_obj
+
+        # 未注册的类重建为 DeserializeInstance 对象
+        new_obj = deserialize_instance(obj_attr_dict)
+        assert new_obj.__classname__ == 'ObjA'
+        assert new_obj.b.b is new_obj
+
+    # 测试 FishSerializer tc
+    def test_fish_serializer_01(self):
+        class Node(object):
+            __slots__ = ('name', 'next', '__weakref__')
+
+            def __init__(self, name, next=None):
+                self.name = name
+                self.next = next
+
+        class Child(Node):
+            __slots__ = ('extra',)
+
+        serializer = FishSerializer(classes=[Node])
+        serializer.register(Child, name='child')
+        head = Child('head')
+        head.extra = {'k': [1, 2.5, None]}
+        node = head
+        for i in range(5000):
+            node.next = Node(i)
+            node = node.next
+        node.next = head
+
+        data = serializer.dumps(Node('x', Node('y')))
+        assert serializer.loads(data).next.name == 'y'
+
+        new_head = serializer.from_dict(serializer.to_dict(head))
+        assert isinstance(new_head, Child)
+        assert new_head.extra == {'k': [1, 2.5, None]}
+        node = new_head.next
+        for i in range(5000):
+            assert node.name == i
+            node = node.next
+        assert node is new_head
+
+    # 测试 FishSerializer 输出格式和 default tc
+    def test_fish_serializer_02(self):
+        class Obj(object):
+            def __init__(self, a):
+                self.a = a
+
+        serializer = FishSerializer(classes=[Obj])
+        data = serializer.dumps(Obj(u'中文'))
+        assert data == u'{"__classname__":"Obj","a":"中文"}'.encode('utf-8')
+        assert serializer.loads(data).a == u'中文'
+
+        with pytest.raises(ValueError):
+            serializer.dumps(Obj(1), fmt='xml')
+        with pytest.raises(TypeError):
+            serializer.to_dict(Obj(datetime.date(2019, 1, 1)))
+
+        serializer = FishSerializer(default=lambda o: o.isoformat())
+        assert serializer.to_dict(Obj(datetime.date(2019, 1, 1)))['a'] == '2019-01-01'
+
+        try:
+            import msgpack
+        except ImportError:
+            with pytest.raises(ValueError):
+                serializer.dumps(Obj(1), fmt='msgpack')
+        else:
+            assert serializer.loads(serializer.dumps(Obj(1), fmt='msgpack'),
+                                    fmt='msgpack').a == 1
+
+    # 测试 FishSerializer 共享引用 tc
+    def test_fish_serializer_03(self):
+        class ObjA(object):
+            def __init__(self, a, b):
+                self.a = a
+                self.b = b
+
+        shared = ObjA(1, None)
+        obj_a = ObjA([shared, shared], (shared,))
+        obj_a.self_ref = obj_a
+        serializer = FishSerializer(classes=[ObjA])
+        obj_attr_dict = serializer.to_dict(obj_a)
+
+        assert obj_attr_dict['a'][0]['__classname__'] == 'ObjA'
+        assert obj_attr_dict['a'][1] == {'__ref__': obj_attr_dict['a'][0]['__id__']}
+        assert obj_attr_dict['b'] == [obj_attr_dict['a'][1]]
+        assert obj_attr_dict['self_ref'] == {'__ref__': obj_attr_dict['__id__']}
+
+        new_obj = serializer.from_dict(obj_attr_dict)
+        assert new_obj.self_ref is new_obj
+        assert new_obj.a[0] is new_obj.a[1] is new_obj.b[0]
+        assert new_obj.a[0].a == 1
+
+        # refs 为 False 时共享的对象每次都完整序列化
+        obj_attr_dict = FishSerializer(refs=False).to_dict(obj_a)
+        assert obj_attr_dict['a'][0] == obj_attr_dict['a'][1] == obj_attr_dict['b'][0]
+        assert obj_attr_dict['self_ref'] == {'__ref__': obj_attr_dict['__id__']}
+
+    # 测试 FishSerializer 容器的共享引用和循环引用 tc
+    def test_fish_serializer_04(self):
+        class Obj(object):
+            def __init__(self, a, b):
+                self.a = a
+                self.b = b
+
+        cyclic_dict = {'k': 1}
+        cyclic_dict['self'] = cyclic_dict
+        cyclic_list = [1]
+        cyclic_list.append(cyclic_list)
+        shared = [1, 2]
+        obj = Obj(shared, {'x': shared, 'd': cyclic_dict, 'l': cyclic_list})
+        serializer = FishSerializer(classes=[Obj])
+
+        obj_attr_dict = serializer.to_dict(obj)
+        # obj 的编号为 0，被引用的容器编号为 1
+        assert obj_attr_dict['a'] == {'__id__': 1, '__items__': [1, 2]}
+        assert obj_attr_dict['b']['x'] == {'__ref__': 1}
+        new_obj = serializer.loads(serializer.dumps(obj))
+        assert new_obj.a == [1, 2] and new_obj.b['x'] is new_obj.a
+        assert new_obj.b['d']['k'] == 1 and new_obj.b['d']['self'] is new_obj.b['d']
+        assert new_obj.b['l'][0] == 1 and new_obj.b['l'][1] is new_obj.b['l']
+
+        # 根对象是循环引用的容器
+        new_list = serializer.loads(serializer.dumps(cyclic_list))
+        assert new_list[1] is new_list
+
+        # refs 为 False 时共享的容器每次都完整序列化，只有循环引用输出为引用
+        obj_attr_dict = FishSerializer(refs=False).to_dict(obj)
+        assert obj_attr_dict['a'] == obj_attr_dict['b']['x'] == [1, 2]
+        assert obj_attr_dict['b']['l']['__items__'][1] == {'__ref__': obj_attr_dict['b']['l']['__id__']}
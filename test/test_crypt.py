@@ -1,4 +1,8 @@
 # coding=utf-8
+import io
+import base64
+import zlib
+from collections import OrderedDict
 import os
 import sys
 import pytest
@@ -68,3 +72,284 @@ class TestCrypt(object):
         message = 'Hello HMAC'
         assert (FishSha256.hashlib_sha256(message) ==
                 '4a1601381dfb85d6e713853a414f6b43daa76a82956911108512202f5a1c0ce4')
+
+    # test hash_files() tc
+    def test_hash_files_01(self, tmpdir):
+        paths = []
+        for i in range(5):
+            path = str(tmpdir.join('file_{}.bin'.format(i)))
+            with open(path, 'wb') as f:
+                f.write(os.urandom(1024 * 1024 * i + 100))
+            paths.append(path)
+        paths.append(conf_filename)
+
+        digests, stats = hash_files(paths, workers=3)
+        assert list(digests.keys()) == paths
+        for path in paths:
+            assert digests[path] == FishMD5.big_file(path)
+        assert stats['files'] == 6
+        assert stats['bytes'] == sum(os.path.getsize(p) for p in paths)
+
+        digests, _ = hash_files(paths[:1], algo='sha256')
+        with open(paths[0], 'rb') as f:
+            assert digests[paths[0]] == hashlib.sha256(f.read()).hexdigest()
+
+    # test hash_files() tc
+    def test_hash_files_02(self):
+        with pytest.raises(ValueError):
+            hash_files([conf_filename], algo='unknown')
+        with pytest.raises(IOError):
+            hash_files([error_conf_filename])
+
+    # test FishHash.file() tc
+    @pytest.mark.parametrize('size', [0, 100, 1024 * 1024, 3 * 1024 * 1024 + 7])
+    def test_fish_hash_file_01(self, tmpdir, size):
+        path = str(tmpdir.join('file.bin'))
+        data = os.urandom(size)
+        with open(path, 'wb') as f:
+            f.write(data)
+        expected = hashlib.sha256(data).hexdigest()
+        modes = ['auto', 'mmap', 'readinto']
+        if hasattr(hashlib, 'file_digest'):
+            modes.append('file_digest')
+        for mode in modes:
+            assert FishHash.file(path, 'sha256', mode=mode) == expected
+        with open(path, 'rb') as f:
+            assert FishHash.file(f, 'sha256') == expected
+        with open(path, 'rb') as f:
+            assert FishHash.file(io.BytesIO(f.read()), 'sha256') == expected
+
+    # test FishHash.file() tc
+    def test_fish_hash_file_02(self):
+        assert FishHash.file(conf_filename) == FishMD5.big_file(conf_filename)
+        with pytest.raises(ValueError):
+            FishHash.file(conf_filename, mode='unknown')
+        with pytest.raises(ValueError):
+            with open(conf_filename, 'rb') as f:
+                FishHash.file(f, mode='mmap')
+
+    # test FishHasher tc
+    def test_fish_hasher_01(self):
+        hasher = FishHasher('md5')
+        hasher.update('hello ').update(b'wor').update(memoryview(b'ld!'))
+        assert hasher.hexdigest() == FishMD5.string('hello world!')
+
+        prefix = FishHasher('sha256', u'中文')
+        other = prefix.copy()
+        prefix.update('a')
+        other.update('b')
+        assert prefix.hexdigest() == hashlib.sha256(u'中文a'.encode('utf-8')).hexdigest()
+        assert other.hexdigest() == hashlib.sha256(u'中文b'.encode('utf-8')).hexdigest()
+
+    # test FishHasher.update_from() tc
+    def test_fish_hasher_02(self):
+        expected = FishMD5.big_file(conf_filename)
+        with open(conf_filename, 'rb') as f:
+            assert FishHasher('md5').update_from(f).hexdigest() == expected
+        with open(conf_filename, 'rb') as f:
+            chunks = iter(lambda: f.read(7), b'')
+            assert FishHasher('md5').update_from(chunks).hexdigest() == expected
+
+    # test FishHasher.hmac() tc
+    def test_fish_hasher_03(self):
+        signer = FishHasher.hmac('12345678', 'sha256')
+        assert (signer.copy().update('Hello HMAC').hexdigest() ==
+                FishSha256.hmac_sha256('12345678', 'Hello HMAC'))
+        assert (signer.copy().update('Hello').update(' HMAC').hexdigest() ==
+                FishSha256.hmac_sha256('12345678', 'Hello HMAC'))
+        assert (FishHasher.hmac(b'salt', 'md5', 'hello world!').hexdigest() ==
+                FishMD5.hmac_md5('hello world!', 'salt'))
+
+    # test FishSigner tc
+    def test_fish_signer_01(self):
+        signer = FishSigner('12345678')
+        assert signer.sign('Hello HMAC') == FishSha256.hmac_sha256('12345678', 'Hello HMAC')
+        assert signer.sign(b'Hello HMAC') == signer.sign('Hello HMAC')
+        messages = ['Hello HMAC', u'中文', '']
+        assert signer.sign_many(messages) == [FishSha256.hmac_sha256('12345678', m)
+                                              for m in messages]
+        assert signer.sign_digest('Hello HMAC') == hmac.new(b'12345678', b'Hello HMAC',
+                                                            hashlib.sha256).digest()
+
+    # test FishSigner tc
+    def test_fish_signer_02(self):
+        # 密钥长度超过 block size
+        secret = 'k' * 200
+        assert FishSigner(secret).sign('msg') == FishSha256.hmac_sha256(secret, 'msg')
+        assert FishSigner('salt', 'md5').sign('hello world!') == FishMD5.hmac_md5('hello world!',
+                                                                                  'salt')
+
+    # test FishBase64 流式编码 tc
+    @pytest.mark.parametrize('size', [0, 1, 2, 3, 100, 10000])
+    def test_base64_stream_01(self, size):
+        data = os.urandom(size)
+        for chunk_size in (3, 7, 4096):
+            encoded = b''.join(FishBase64.iter_encode(io.BytesIO(data), chunk_size=chunk_size))
+            assert encoded == base64.b64encode(data)
+            decoded = b''.join(FishBase64.iter_decode([encoded[:5], encoded[5:]],
+                                                      chunk_size=chunk_size))
+            assert decoded == data
+
+        encoded = b''.join(FishBase64.iter_encode([data], chunk_size=9, line_length=76))
+        assert encoded == base64.encodebytes(data)
+        assert b''.join(FishBase64.iter_decode([encoded])) == data
+
+        encoded = b''.join(FishBase64.iter_encode([data], urlsafe=True))
+        assert encoded == base64.urlsafe_b64encode(data)
+        assert b''.join(FishBase64.iter_decode([encoded], urlsafe=True)) == data
+
+    # test FishBase64 流式编码文件 tc
+    def test_base64_stream_02(self, tmpdir):
+        src = str(tmpdir.join('src.bin'))
+        encoded = str(tmpdir.join('src.b64'))
+        decoded = str(tmpdir.join('dst.bin'))
+        data = os.urandom(100000)
+        with open(src, 'wb') as f:
+            f.write(data)
+        FishBase64.encode_file(src, encoded, chunk_size=1000, line_length=76)
+        assert FishBase64.decode_file(encoded, decoded, chunk_size=333) == len(data)
+        with open(decoded, 'rb') as f:
+            assert f.read() == data
+        assert FishBase64.file(conf_filename) == b''.join(FishBase64.iter_encode(conf_filename))
+
+        # bytes 作为数据处理，文件名可以是 PathLike 对象
+        assert b''.join(FishBase64.iter_encode(data, chunk_size=999)) == base64.b64encode(data)
+        assert b''.join(FishBase64.iter_decode(bytearray(base64.b64encode(data)))) == data
+        assert b''.join(FishBase64.iter_encode(tmpdir.join('src.bin'))) == base64.b64encode(data)
+
+        with pytest.raises(ValueError):
+            list(FishBase64.iter_encode([data], line_length=10))
+
+    # test FileDigestCache tc
+    def test_file_digest_cache_01(self, tmpdir):
+        db_filename = str(tmpdir.join('cache.db'))
+        paths = []
+        for i in range(3):
+            path = str(tmpdir.join('file_{}.bin'.format(i)))
+            with open(path, 'wb') as f:
+                f.write(os.urandom(1000))
+            paths.append(path)
+
+        cache = FileDigestCache(db_filename)
+        assert cache.digest(paths[0]) == FishMD5.big_file(paths[0])
+        assert cache.digest(paths[0]) == FishMD5.big_file(paths[0])
+        assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+        digests = cache.digest_files(paths, algo='sha256', workers=2)
+        assert list(digests.keys()) == paths
+        assert digests[paths[1]] == FishHash.file(paths[1], 'sha256')
+        cache.close()
+
+        # 另外打开缓存，修改过的文件重新计算
+        with open(paths[2], 'ab') as f:
+            f.write(b'changed')
+        cache = FileDigestCache(db_filename)
+        digests = cache.digest_files(paths, algo='sha256')
+        assert digests[paths[2]] == FishHash.file(paths[2], 'sha256')
+        assert cache.stats()['hits'] == 2
+        assert cache.stats()['misses'] == 1
+        cache.close()
+
+    # test FishHash.multi_file() tc
+    @pytest.mark.parametrize('size', [0, 1000, 2 * 1024 * 1024 + 1])
+    def test_fish_hash_multi_file_01(self, tmpdir, size):
+        path = str(tmpdir.join('file.bin'))
+        data = os.urandom(size)
+        with open(path, 'wb') as f:
+            f.write(data)
+        result = FishHash.multi_file(path, ['md5', 'sha256', 'crc32'])
+        assert list(result.keys()) == ['md5', 'sha256', 'crc32']
+        assert result['md5'] == hashlib.md5(data).hexdigest()
+        assert result['sha256'] == hashlib.sha256(data).hexdigest()
+        assert result['crc32'] == '%08x' % (zlib.crc32(data) & 0xffffffff)
+        assert FishHash.file(path, 'crc32') == result['crc32']
+        with open(path, 'rb') as f:
+            assert FishHash.multi_file(f, ['md5', 'crc32']) == OrderedDict(
+                [('md5', result['md5']), ('crc32', result['crc32'])])
+        # multi_file 不支持 file_digest，错误信息不应列出 file_digest
+        with pytest.raises(ValueError) as excinfo:
+            FishHash.multi_file(path, mode='file_digest')
+        assert 'file_digest' not in str(excinfo.value).split('but')[0]
+
+    # test FishHash.multi_file() 每片数据交给所有算法后再读取下一片 tc
+    @pytest.mark.parametrize('mode', ['mmap', 'readinto'])
+    def test_fish_hash_multi_file_02(self, tmpdir, monkeypatch, mode):
+        import fishbase.fish_crypt as fish_crypt
+
+        calls = []
+
+        class Recorder(object):
+            def __init__(self, algo):
+                self.algo = algo
+
+            def update(self, data):
+                calls.append((self.algo, len(data)))
+
+            def hexdigest(self):
+                return ''
+
+        monkeypatch.setattr(fish_crypt, 'hash_buffer_size', 1024)
+        monkeypatch.setattr(fish_crypt, '_new_hash', Recorder)
+        path = str(tmpdir.join('file.bin'))
+        with open(path, 'wb') as f:
+            f.write(os.urandom(2500))
+        FishHash.multi_file(path, ['md5', 'sha256'], mode=mode)
+        assert calls == [('md5', 1024), ('sha256', 1024), ('md5', 1024), ('sha256', 1024),
+                         ('md5', 452), ('sha256', 452)]
+
+    # test FishMerkle tc
+    def test_fish_merkle_01(self, tmpdir):
+        path = str(tmpdir.join('backup.bin'))
+        data = os.urandom(10 * 1000 + 1)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        merkle = FishMerkle(block_size=1000)
+        digests, root = merkle.build(path)
+        assert len(digests) == 11
+        assert digests[3] == hashlib.sha256(data[3000:4000]).hexdigest()
+        assert digests[10] == hashlib.sha256(data[10000:]).hexdigest()
+        assert merkle.build(path, workers=3)[1] == root
+        assert merkle.verify(path, digests, workers=2) == []
+
+        # 损坏第 5 块
+        with open(path, 'r+b') as f:
+            f.seek(5500)
+            f.write(b'\0' if data[5500:5501] != b'\0' else b'\1')
+        assert merkle.verify(path, digests, workers=2) == [5]
+        assert merkle.verify(path, digests, blocks=[0, 1]) == []
+        assert merkle.build(path)[1] != root
+
+        # 文件变短
+        with open(path, 'r+b') as f:
+            f.truncate(9000)
+        assert merkle.verify(path, digests) == [5, 9, 10]
+
+    # test FishMerkle.root() tc
+    def test_fish_merkle_02(self, tmpdir):
+        merkle = FishMerkle()
+        leaves = [hashlib.sha256(c).hexdigest() for c in (b'a', b'b', b'c')]
+        leaf_a, leaf_b, leaf_c = [hashlib.sha256(b'\x00' + hashlib.sha256(c).digest()).digest()
+                                  for c in (b'a', b'b', b'c')]
+        node_ab = hashlib.sha256(b'\x01' + leaf_a + leaf_b).digest()
+        expected = hashlib.sha256(b'\x01' + node_ab + leaf_c).hexdigest()
+        assert merkle.root(leaves) == expected
+        assert merkle.root(leaves[:1]) == binascii.hexlify(leaf_a).decode('ascii')
+        # 内部节点不能作为叶子伪造出相同的根
+        assert merkle.root([binascii.hexlify(node_ab).decode('ascii'),
+                            binascii.hexlify(leaf_c).decode('ascii')]) != expected
+        assert merkle.root([]) == hashlib.sha256().hexdigest()
+
+        path = str(tmpdir.join('empty.bin'))
+        open(path, 'wb').close()
+        assert merkle.build(path) == ([], hashlib.sha256().hexdigest())
+        with pytest.raises(ValueError):
+            FishMerkle(block_size=0)
+
+    # test FishMerkle 多进程 tc
+    def test_fish_merkle_03(self, tmpdir):
+        path = str(tmpdir.join('backup.bin'))
+        with open(path, 'wb') as f:
+            f.write(os.urandom(5000))
+        merkle = FishMerkle(block_size=1024, algo='md5')
+        assert merkle.build(path, workers=2, use_process=True) == merkle.build(path)
@@ -3,9 +3,10 @@ import io
 import os
 import sys
 import shutil
+import sqlite3
 import pytest
 
-from fishbase.fish_csv import csv2list, list2csv, csv2dict, dict2csv
+from fishbase.fish_csv import csv2list, list2csv, csv2dict, dict2csv, csv2sqlite
 
 
 # 2018.6.27 v1.0.14 #73 create by Jia ChunYing
@@ -89,3 +90,100 @@ class TestCsv(object):
         with pytest.raises(ValueError):
             data_dict = [[1, 2], {'a': '3', 'b': '4'}]
             dict2csv(data_dict, key_is_header=True)
+
+    # 测试压缩 csv 文件读写 tc
+    @pytest.mark.parametrize('ext', ['.gz', '.bz2', '.xz'])
+    def test_csv_compression_01(self, tmpdir, ext):
+        csv_file_name = str(tmpdir.join('test_file.csv' + ext))
+        data_list = [['a', 'b'], ['1', u'中文']]
+        list2csv(data_list, csv_file_name, encoding='utf-8')
+        assert csv2list(csv_file_name, encoding='utf-8') == data_list
+        # 文件内容确实是压缩过的
+        with io.open(csv_file_name, 'rb') as f:
+            assert not f.read().startswith(b'a,b')
+
+    # 测试根据文件头判断压缩格式 tc
+    def test_csv_compression_02(self, tmpdir):
+        csv_file_name = str(tmpdir.join('test_file.csv'))
+        dict2csv({'a': '1', 'b': '2'}, csv_file_name, compression='gzip', compresslevel=1)
+        result = csv2dict(csv_file_name)
+        assert result == {'a': '1', 'b': '2'}
+
+    # 测试压缩 csv 文件读写 tc
+    def test_csv_compression_03(self, tmpdir):
+        csv_file_name = str(tmpdir.join('test_file.csv.bz2'))
+        data_dict = [{'a': '1', 'b': '2'}, {'a': '3', 'b': '4'}]
+        dict2csv(data_dict, csv_file_name, key_is_header=True)
+        result = csv2dict(csv_file_name, key_is_header=True)
+        assert {'a': '1', 'b': '2'} in result
+
+    # 测试压缩 csv 文件读写 tc
+    def test_csv_compression_04(self, tmpdir):
+        csv_file_name = str(tmpdir.join('test_file.csv'))
+        with pytest.raises(ValueError):
+            list2csv([['a']], csv_file_name, compression='zip')
+
+    # 测试 csv2sqlite() tc
+    def test_csv2sqlite_01(self, tmpdir):
+        csv_file_name = str(tmpdir.join('test_file.csv.gz'))
+        data_list = [['id', 'name', 'score']] + [[str(i), 'n{}'.format(i), str(i / 2.0)]
+                                                 for i in range(25)]
+        list2csv(data_list, csv_file_name)
+        db_file_name = str(tmpdir.join('test.db'))
+        result = csv2sqlite(csv_file_name, db_file_name, 'test_table', batch_size=10,
+                            indexes=['id', ('name', 'score')])
+        assert result['rows'] == 25
+        assert result['rows_per_sec'] > 0
+
+        conn = sqlite3.connect(db_file_name)
+        columns = conn.execute('PRAGMA table_info(test_table)').fetchall()
+        assert [(c[1], c[2]) for c in columns] == [('id', 'INTEGER'), ('name', 'TEXT'),
+                                                   ('score', 'REAL')]
+        assert conn.execute('SELECT SUM(id) FROM test_table').fetchone()[0] == 300
+        index_list = conn.execute('PRAGMA index_list(test_table)').fetchall()
+        assert len(index_list) == 2
+        conn.close()
+
+    # 测试 csv2sqlite() tc
+    def test_csv2sqlite_02(self, tmpdir):
+        csv_file_name = str(tmpdir.join('test_file.csv'))
+        list2csv([['1', 'a'], ['2', 'b']], csv_file_name)
+        conn = sqlite3.connect(':memory:')
+        result = csv2sqlite(csv_file_name, conn, 'test_table', has_header=False)
+        assert result['rows'] == 2
+        assert conn.execute('SELECT col_2 FROM test_table WHERE col_1 = 2').fetchone()[0] == 'b'
+        conn.close()
+
+    # 测试 csv2sqlite() 恢复 PRAGMA 设置 tc
+    def test_csv2sqlite_03(self, tmpdir):
+        csv_file_name = str(tmpdir.join('test_file.csv'))
+        list2csv([['1', 'a'], ['2', 'b']], csv_file_name)
+
+        # WAL 模式的数据库导入后仍然是 WAL 模式
+        db_file_name = str(tmpdir.join('test.db'))
+        conn = sqlite3.connect(db_file_name)
+        assert conn.execute('PRAGMA journal_mode=WAL').fetchone()[0] == 'wal'
+        conn.close()
+        csv2sqlite(csv_file_name, db_file_name, 'test_table', has_header=False)
+        conn = sqlite3.connect(db_file_name)
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        conn.close()
+
+        # 传入的连接不修改设置，pragmas 中指定的设置导入后恢复
+        conn = sqlite3.connect(str(tmpdir.join('test2.db')))
+        synchronous = conn.execute('PRAGMA synchronous').fetchone()[0]
+        csv2sqlite(csv_file_name, conn, 'test_table', has_header=False)
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == synchronous
+        csv2sqlite(csv_file_name, conn, 'test_table', has_header=False,
+                   pragmas={'synchronous': 'OFF', 'cache_size': -1024})
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == synchronous
+        assert conn.execute('SELECT COUNT(*) FROM test_table').fetchone()[0] == 4
+
+        # 传入的连接有未提交的事务时不导入，也不影响该事务
+        conn.execute('INSERT INTO test_table VALUES (3, ?)', ('c',))
+        with pytest.raises(ValueError):
+            csv2sqlite(csv_file_name, conn, 'test_table', has_header=False)
+        assert conn.in_transaction
+        conn.rollback()
+        assert conn.execute('SELECT COUNT(*) FROM test_table').fetchone()[0] == 4
+        conn.close()
@@ -0,0 +1,543 @@
+# coding=utf-8
+# fish_logger.py 单元测试
+# v1.2.0 create
+import os
+import re
+import sys
+import atexit
+import json
+import gzip
+import glob
+import time
+import logging
+import multiprocessing
+import pytest
+
+from fishbase import fish_logger
+from fishbase.fish_logger import *
+
+
+def _make_record(msg, level=logging.INFO):
+    return logging.makeLogRecord({'msg': msg, 'levelno': level,
+                                  'levelname': logging.getLevelName(level)})
+
+
+def _read_log(log_filename):
+    content = ''
+    for filename in glob.glob(log_filename + '.*'):
+        with open(filename) as f:
+            content += f.read()
+    return content
+
+
+def _process_safe_worker(log_filename, worker_id, count):
+    handler = ProcessSafeFileHandler(log_filename)
+    handler.setFormatter(logging.Formatter('%(process)d %(message)s'))
+    for i in range(count):
+        handler.emit(_make_record('worker-{}-{} {}'.format(worker_id, i, 'x' * (i % 500))))
+    handler.close()
+
+
+class TestLogger(object):
+
+    def teardown_method(self, method):
+        teardown()
+
+    # 测试 set_log_file() tc
+    def test_set_log_file_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        set_log_file(log_filename)
+        logger.info('test fish base log')
+        assert 'test fish base log' in _read_log(log_filename)
+
+    # 测试 set_log_file() 异步模式 tc
+    def test_set_log_file_async_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        set_log_file(log_filename, async_mode=True)
+        handler = logger.handlers[-1]
+        assert isinstance(handler, FishQueueHandler)
+        for i in range(100):
+            logger.info('async log %d', i)
+        handler.listener.stop()
+        content = _read_log(log_filename)
+        assert 'async log 0' in content
+        assert 'async log 99' in content
+
+    # 测试 FishQueueHandler 队列满时的处理策略 tc
+    @pytest.mark.parametrize('overflow, last', [(overflow_drop_newest, 'msg 1'),
+                                                (overflow_drop_oldest, 'msg 4')])
+    def test_queue_handler_overflow_01(self, overflow, last):
+        handler = FishQueueHandler(queue.Queue(2), overflow=overflow)
+        for i in range(5):
+            handler.handle(_make_record('msg {}'.format(i)))
+        assert handler.dropped == 3
+        records = [handler.queue.get_nowait() for _ in range(2)]
+        assert records[-1].getMessage() == last
+
+    # 测试 FishQueueHandler 队列满时的处理策略 tc
+    def test_queue_handler_overflow_02(self):
+        with pytest.raises(ValueError):
+            FishQueueHandler(queue.Queue(2), overflow='unknown')
+
+    # 测试 overflow_drop_oldest 不会丢弃 listener 的结束标记 tc
+    def test_queue_handler_overflow_03(self):
+        class SlowHandler(logging.Handler):
+            def emit(self, record):
+                time.sleep(0.001)
+
+        for _ in range(5):
+            listener = FishQueueListener(queue.Queue(2), SlowHandler())
+            handler = FishQueueHandler(listener.queue, overflow=overflow_drop_oldest)
+            listener.start()
+            stopped = threading.Event()
+
+            def writer():
+                while not stopped.is_set():
+                    handler.handle(_make_record('msg'))
+
+            writer_thread = threading.Thread(target=writer)
+            writer_thread.start()
+            time.sleep(0.01)
+            stop_thread = threading.Thread(target=listener.stop)
+            stop_thread.start()
+            stop_thread.join(5)
+            stopped.set()
+            writer_thread.join(5)
+            assert not stop_thread.is_alive()
+
+    # 测试 SafeFileHandler 按天切换文件 tc
+    def test_safe_file_handler_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        handler = SafeFileHandler(log_filename)
+        record = _make_record('day 1')
+        handler.emit(record)
+        first_filename = handler.baseFilename
+        assert first_filename == log_filename + '.' + time.strftime('%Y-%m-%d')
+        assert handler.rollover_at > record.created
+
+        # 同一天内不会重新打开文件
+        stream = handler.stream
+        handler.emit(_make_record('day 1 again'))
+        assert handler.stream is stream
+
+        # 超过零点后切换文件
+        handler.rollover_at = 0
+        handler.suffix_time = '2000-01-01'
+        handler.baseFilename = log_filename + '.2000-01-01'
+        handler.emit(_make_record('day 2'))
+        assert handler.baseFilename == first_filename
+        assert handler.stream is not stream
+        handler.close()
+
+    # 测试 SafeFileHandler 日志文件被删除后重建 tc
+    def test_safe_file_handler_02(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        handler = SafeFileHandler(log_filename, check_interval=0)
+        handler.emit(_make_record('before remove'))
+        handler.close()
+        os.remove(handler.baseFilename)
+        handler.emit(_make_record('after remove'))
+        handler.close()
+        assert _read_log(log_filename) == 'after remove\n'
+
+    # 测试 BufferedSafeFileHandler tc
+    def test_buffered_handler_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        handler = BufferedSafeFileHandler(log_filename, capacity=3, flush_interval=None)
+        handler.emit(_make_record('msg 1'))
+        handler.emit(_make_record('msg 2'))
+        assert _read_log(log_filename) == ''
+        handler.emit(_make_record('msg 3'))
+        assert _read_log(log_filename) == 'msg 1\nmsg 2\nmsg 3\n'
+
+        # ERROR 级别立即写入
+        handler.emit(_make_record('msg 4', logging.ERROR))
+        assert _read_log(log_filename).endswith('msg 4\n')
+
+        # 关闭时写入缓冲中剩余的日志
+        handler.emit(_make_record('msg 5'))
+        handler.close()
+        assert _read_log(log_filename).endswith('msg 5\n')
+
+    # 测试 BufferedSafeFileHandler 按大小和时间写入 tc
+    def test_buffered_handler_02(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        handler = BufferedSafeFileHandler(log_filename, buffer_size=10, flush_interval=None)
+        handler.emit(_make_record('a' * 10))
+        assert _read_log(log_filename) == 'a' * 10 + '\n'
+        handler.close()
+
+        handler = BufferedSafeFileHandler(log_filename, flush_interval=20)
+        handler.emit(_make_record('timer'))
+        time.sleep(0.2)
+        assert _read_log(log_filename).endswith('timer\n')
+        handler.close()
+
+    # 测试 set_log_file() 缓冲模式 tc
+    def test_set_log_file_buffered_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        set_log_file(log_filename, buffered=True)
+        assert isinstance(logger.handlers[-1], BufferedSafeFileHandler)
+        logger.info('buffered log')
+        logger.handlers[-1].flush()
+        assert 'buffered log' in _read_log(log_filename)
+
+    # 测试 ProcessSafeFileHandler 截断超长日志 tc
+    def test_process_safe_handler_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        handler = ProcessSafeFileHandler(log_filename, max_record_size=16)
+        handler.emit(_make_record('short'))
+        handler.emit(_make_record('a' * 100))
+        handler.close()
+        assert _read_log(log_filename) == 'short\n' + 'a' * 12 + '...\n'
+
+        # 多字节字符按字符边界截断
+        log_filename = str(tmpdir.join('fish_test_utf8.log'))
+        handler = ProcessSafeFileHandler(log_filename, max_record_size=17)
+        handler.emit(_make_record(u'中' * 10))
+        handler.close()
+        with open(handler.baseFilename, 'rb') as f:
+            assert f.read().decode('utf-8') == u'中' * 4 + '...\n'
+
+    # 测试 ProcessSafeFileHandler 多进程写入不丢失、不穿插 tc
+    @pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                        reason='fork start method is required')
+    def test_process_safe_handler_02(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        ctx = multiprocessing.get_context('fork')
+        workers, count = 4, 2000
+        processes = [ctx.Process(target=_process_safe_worker, args=(log_filename, i, count))
+                     for i in range(workers)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+
+        lines = _read_log(log_filename).splitlines()
+        assert len(lines) == workers * count
+        pattern = re.compile(r'^\d+ worker-(\d+)-(\d+) (x*)$')
+        seen = set()
+        for line in lines:
+            m = pattern.match(line)
+            assert m is not None
+            assert len(m.group(3)) == int(m.group(2)) % 500
+            seen.add((m.group(1), m.group(2)))
+        assert len(seen) == workers * count
+
+    # 测试 set_log_file() 多进程安全模式 tc
+    def test_set_log_file_process_safe_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        with pytest.raises(ValueError):
+            set_log_file(log_filename, buffered=True, process_safe=True)
+        set_log_file(log_filename, process_safe=True)
+        assert isinstance(logger.handlers[-1], ProcessSafeFileHandler)
+        logger.info('process safe log')
+        assert 'process safe log' in _read_log(log_filename)
+
+    # 测试 JsonFormatter tc
+    def test_json_formatter_01(self):
+        formatter = JsonFormatter()
+        record = logging.makeLogRecord({'msg': 'hello %s', 'args': ('world',), 'levelno': logging.INFO,
+                                        'levelname': 'INFO', 'filename': 'a.py', 'lineno': 10,
+                                        'created': 1556676000.123, 'msecs': 123.0, 'user': u'中文'})
+        data = json.loads(formatter.format(record))
+        assert data['message'] == 'hello world'
+        assert data['level'] == 'INFO'
+        assert data['file'] == 'a.py'
+        assert data['line'] == 10
+        assert data['user'] == u'中文'
+        assert data['time'].endswith(',123')
+        assert list(data.keys())[:5] == ['time', 'level', 'file', 'line', 'message']
+
+    # 测试 JsonFormatter 自定义字段和异常信息 tc
+    def test_json_formatter_02(self):
+        formatter = JsonFormatter(fields=[('msg', 'message')], extra=False)
+        try:
+            raise ValueError('bad value')
+        except ValueError:
+            record = logging.makeLogRecord({'msg': 'error', 'exc_info': sys.exc_info(),
+                                            'user': 'david'})
+        data = json.loads(formatter.format(record))
+        assert data['msg'] == 'error'
+        assert 'user' not in data
+        assert 'ValueError: bad value' in data['exc_info']
+
+    # 测试 set_log_file() json 格式 tc
+    def test_set_log_file_json_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        set_log_file(log_filename, json_format=True)
+        logger.info('json log', extra={'request_id': 1})
+        data = json.loads(_read_log(log_filename).splitlines()[-1])
+        assert data['message'] == 'json log'
+        assert data['request_id'] == 1
+
+    # 测试异步 json 模式单独输出 exc_info，关闭时取消 atexit 注册 tc
+    def test_set_log_file_json_02(self, tmpdir, monkeypatch):
+        unregistered = []
+        monkeypatch.setattr(atexit, 'unregister', unregistered.append)
+        log_filename = str(tmpdir.join('fish_test.log'))
+        set_log_file(log_filename, async_mode=True, json_format=True)
+        handler = logger.handlers[-1]
+        try:
+            raise ValueError('bad value')
+        except ValueError:
+            logger.exception('async json %s', 'error')
+        handler.close()
+        assert unregistered == [handler.listener.stop]
+        data = json.loads(_read_log(log_filename).splitlines()[-1])
+        assert data['message'] == 'async json error'
+        assert 'ValueError: bad value' in data['exc_info']
+
+    # 测试 RateLimitFilter 去重 tc
+    def test_rate_limit_filter_01(self):
+        log_filter = RateLimitFilter(window=10)
+        results = []
+        for i in range(5):
+            record = _make_record('hot loop %d')
+            record.created = 100 + i
+            results.append(log_filter.filter(record))
+        assert results == [True, False, False, False, False]
+        assert log_filter.suppressed == 4
+
+        # 下一个时间窗口输出抑制的数量
+        record = _make_record('hot loop %d')
+        record.args = (1,)
+        record.created = 111
+        assert log_filter.filter(record) is True
+        assert record.getMessage() == 'hot loop 1 (suppressed 4 similar)'
+
+        # 不同位置的日志互不影响
+        other = _make_record('other')
+        other.created = 111
+        assert log_filter.filter(other) is True
+
+    # 测试 RateLimitFilter LRU 和采样 tc
+    def test_rate_limit_filter_02(self):
+        log_filter = RateLimitFilter(window=10, max_keys=2)
+        for i in range(3):
+            log_filter.filter(_make_record('msg {}'.format(i)))
+        assert len(log_filter._states) == 2
+
+        log_filter = RateLimitFilter(window=0, sample_rate=0)
+        assert log_filter.filter(_make_record('info')) is False
+        assert log_filter.filter(_make_record('error', logging.ERROR)) is True
+        assert log_filter.sampled_out == 1
+
+    # 测试 RateLimitFilter 淘汰和 flush() 时输出抑制计数 tc
+    def test_rate_limit_filter_03(self):
+        summaries = []
+        test_logger = logging.getLogger('fish_rate_limit_test')
+        test_logger.propagate = False
+        handler = logging.Handler()
+        handler.emit = lambda r: summaries.append(r.getMessage())
+        test_logger.addHandler(handler)
+
+        def make(msg):
+            record = _make_record(msg)
+            record.name = test_logger.name
+            return record
+
+        try:
+            log_filter = RateLimitFilter(window=10, max_keys=2)
+            test_logger.addFilter(log_filter)
+            for msg in ('hot', 'hot', 'cold', 'hot'):
+                log_filter.filter(make(msg))
+            # hot 被抑制时刷新了 LRU 位置，新的位置淘汰的是 cold
+            log_filter.filter(make('new'))
+            assert list(k[2] for k in log_filter._states) == ['hot', 'new']
+            assert summaries == []
+
+            # hot 被淘汰时输出汇总
+            log_filter.filter(make('newer'))
+            log_filter.filter(make('newest'))
+            assert summaries == ['hot (suppressed 2 similar)']
+
+            log_filter.filter(make('newest'))
+            assert log_filter.flush() == 1
+            assert log_filter.flush() == 0
+            assert summaries[-1] == 'newest (suppressed 1 similar)'
+        finally:
+            test_logger.removeFilter(log_filter)
+            test_logger.removeHandler(handler)
+
+    # 测试 set_log_file() 重复调用不会重复添加 handler tc
+    def test_set_log_file_idempotent_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        count = len(logger.handlers)
+        set_log_file(log_filename)
+        set_log_file(log_filename)
+        set_log_stdout()
+        set_log_stdout()
+        assert len(logger.handlers) == count + 2
+        logger.info('only once')
+        assert _read_log(log_filename).count('only once') == 1
+
+        teardown()
+        assert len(logger.handlers) == count
+
+    # 测试 set_log_file() 日志级别 tc
+    def test_set_log_file_level_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        set_log_file(log_filename, level=logging.WARNING)
+        set_log_stdout(level=logging.DEBUG)
+        assert logger.level == logging.DEBUG
+        logger.info('info log')
+        logger.warning('warning log')
+        content = _read_log(log_filename)
+        assert 'info log' not in content
+        assert 'warning log' in content
+
+    # 测试 teardown() 关闭日志文件 tc
+    def test_teardown_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        set_log_file(log_filename, async_mode=True)
+        handler = logger.handlers[-1]
+        logger.info('before teardown')
+        teardown()
+        assert handler not in logger.handlers
+        assert handler.listener.handlers[0].stream is None
+        assert 'before teardown' in _read_log(log_filename)
+
+    # 测试 LogArchiver 压缩和清理旧日志 tc
+    def test_log_archiver_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        for day in range(1, 6):
+            with open('{}.2019-01-0{}'.format(log_filename, day), 'w') as f:
+                f.write('log line\n' * 1000)
+        current_filename = log_filename + '.2019-01-06'
+        open(current_filename, 'w').close()
+
+        archiver = LogArchiver(backup_count=3)
+        archiver.archive(log_filename, current_filename)
+        archiver.join()
+
+        names = sorted(os.listdir(str(tmpdir)))
+        assert names == ['fish_test.log.2019-01-03.gz', 'fish_test.log.2019-01-04.gz',
+                         'fish_test.log.2019-01-05.gz', 'fish_test.log.2019-01-06',
+                         'fish_test.log.archive.lock']
+        with gzip.open(log_filename + '.2019-01-05.gz', 'rt') as f:
+            assert f.read() == 'log line\n' * 1000
+        stats = archiver.stats()
+        assert stats['files_compressed'] == 5
+        assert stats['files_removed'] == 2
+        assert stats['bytes_reclaimed'] > 9000 * 3
+
+    # 测试 LogArchiver 按总大小清理 tc
+    def test_log_archiver_02(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        for day in range(1, 4):
+            with open('{}.2019-01-0{}.gz'.format(log_filename, day), 'wb') as f:
+                f.write(b'x' * 100)
+        archiver = LogArchiver(max_total_size=150)
+        archiver.archive(log_filename, log_filename + '.2019-01-04')
+        archiver.join()
+        assert sorted(os.listdir(str(tmpdir))) == ['fish_test.log.2019-01-03.gz',
+                                                   'fish_test.log.archive.lock']
+
+        with pytest.raises(ValueError):
+            LogArchiver(compression='zip')
+
+    # 测试 SafeFileHandler 切换后调用 LogArchiver tc
+    def test_log_archiver_03(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        set_log_file(log_filename, archive='gzip')
+        handler = logger.handlers[-1]
+        old_filename = log_filename + '.2000-01-01'
+        handler.emit(_make_record('today'))
+        with open(old_filename, 'w') as f:
+            f.write('old log\n')
+        # 模拟从 2000-01-01 切换到今天
+        handler.suffix_time = '2000-01-01'
+        handler.baseFilename = old_filename
+        handler.rollover_at = 0
+        handler.emit(_make_record('today again'))
+        handler.archiver.join()
+        assert os.path.exists(old_filename + '.gz')
+        assert not os.path.exists(old_filename)
+
+        stats = get_log_metrics()[os.path.abspath(log_filename)]['archive']
+        assert stats['files_compressed'] == 1
+        assert 'bytes_reclaimed' in stats
+
+    # 测试重复设置时停止 LogArchiver 的后台线程 tc
+    def test_log_archiver_04(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        set_log_file(log_filename, archive='gzip')
+        archiver = logger.handlers[-1].archiver
+        set_log_file(log_filename, archive='gzip')
+        archiver._thread.join(5)
+        assert not archiver._thread.is_alive()
+        archiver = logger.handlers[-1].archiver
+        teardown()
+        archiver._thread.join(5)
+        assert not archiver._thread.is_alive()
+
+    # 测试第一次打开日志文件时处理之前运行留下的旧文件，其他进程持有锁时跳过 tc
+    def test_log_archiver_05(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        old_filename = log_filename + '.2000-01-01'
+        with open(old_filename, 'w') as f:
+            f.write('old log\n')
+
+        # 模拟其他进程正在处理
+        if fish_logger.fcntl is None and fish_logger.msvcrt is None:
+            pytest.skip('file lock is not supported')
+        lock_fd = os.open(log_filename + '.archive.lock', os.O_RDWR | os.O_CREAT)
+        try:
+            assert fish_logger._lock_file(lock_fd)
+            archiver = LogArchiver()
+            archiver.archive(log_filename, log_filename + '.2000-01-02')
+            archiver.join()
+            assert archiver.stats()['skipped'] == 1
+            assert os.path.exists(old_filename)
+            archiver.stop()
+        finally:
+            os.close(lock_fd)
+
+        set_log_file(log_filename, archive='gzip')
+        handler = logger.handlers[-1]
+        handler.emit(_make_record('first'))
+        handler.archiver.join()
+        assert os.path.exists(old_filename + '.gz')
+        assert not os.path.exists(old_filename)
+
+    # 测试 enable_log_metrics() tc
+    def test_log_metrics_01(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        set_log_file(log_filename)
+        handler = logger.handlers[-1]
+        assert get_log_metrics() == {}
+
+        enable_log_metrics()
+        # 日志文件按 locale 的编码写入，换成当前编码能表示的内容
+        encoding = handler.stream.encoding
+        msg = u'metrics log 中文'.encode(encoding, 'replace').decode(encoding)
+        for i in range(10):
+            logger.info(msg + ' %d', i)
+        metrics = get_log_metrics()[os.path.abspath(log_filename)]
+        assert metrics['records'] == 10
+        # 按实际写入文件的字节数统计
+        assert metrics['bytes_written'] == sum(os.path.getsize(filename)
+                                               for filename in glob.glob(log_filename + '.*'))
+        assert sum(metrics['latency_histogram'].values()) == 10
+        assert metrics['records_per_sec'] > 0
+
+        # 关闭后恢复原来的方法
+        disable_log_metrics()
+        assert 'emit' not in handler.__dict__
+        assert get_log_metrics() == {}
+
+    # 测试 enable_log_metrics() 异步模式 tc
+    def test_log_metrics_02(self, tmpdir):
+        log_filename = str(tmpdir.join('fish_test.log'))
+        enable_log_metrics()
+        set_log_file(log_filename, async_mode=True)
+        handler = logger.handlers[-1]
+        logger.info('async metrics log')
+        handler.listener.stop()
+        metrics = get_log_metrics()
+        key = os.path.abspath(log_filename)
+        assert metrics[key]['records'] == 1
+        assert metrics[key]['queue_depth'] == 0
+        assert metrics[key]['dropped'] == 0
+        assert metrics[key + '#writer0']['records'] == 1